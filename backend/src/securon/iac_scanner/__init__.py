@@ -2,6 +2,6 @@
 
 from .interfaces import *
 from .scanner import ConcreteIaCScanner, IaCScannerError
-from .terraform_parser import TerraformParser, TerraformParseError
+from .terraform_parser import TerraformParser, TerraformParseError, TerraformParseCache
 from .security_rules import SecurityRuleEngine, DefaultSecurityRules
 from .factory import IaCScannerFactory
\ No newline at end of file
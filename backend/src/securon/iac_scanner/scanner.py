@@ -27,6 +27,8 @@ class ConcreteIaCScanner(IaCScanner):
         self.terraform_parser = TerraformParser()
         self.security_rule_engine = SecurityRuleEngine()
         self.applied_rules: List[SecurityRule] = []
+        # Applied rules that can match each resource type, built lazily
+        self._rules_by_type: Dict[str, List[SecurityRule]] = {}
         
         # Load default security rules
         self._load_default_rules()
@@ -42,6 +44,8 @@ class ConcreteIaCScanner(IaCScanner):
             # Fallback to basic rules (silently)
             default_rules = DefaultSecurityRules.get_default_rules()
             self.applied_rules.extend(default_rules)
+        
+        self._rules_by_type.clear()
     
     async def scan_file(self, file_path: str) -> List[ScanResult]:
         """Scan a single Terraform file for security misconfigurations"""
@@ -114,13 +118,28 @@ class ConcreteIaCScanner(IaCScanner):
         for default_rule in default_rules:
             if default_rule.id not in existing_rule_ids:
                 self.applied_rules.append(default_rule)
+        
+        self._rules_by_type.clear()
+    
+    def _rules_for_type(self, resource_type: str) -> List[SecurityRule]:
+        """Get the applied rules that can match a resource type, in rule order"""
+        rules = self._rules_by_type.get(resource_type)
+        if rules is None:
+            rules = []
+            for rule in self.applied_rules:
+                resource_types = self.security_rule_engine.get_rule_resource_types(rule)
+                if resource_types is None or resource_type in resource_types:
+                    rules.append(rule)
+            self._rules_by_type[resource_type] = rules
+        return rules
     
     async def _apply_rules_to_resource(self, resource: TerraformResource) -> List[ScanResult]:
         """Apply all security rules to a single Terraform resource"""
         results = []
         seen_violations = set()
         
-        for rule in self.applied_rules:
+        # Skip rules that are known not to apply to this resource type
+        for rule in self._rules_for_type(resource.type):
             violations = await self.security_rule_engine.check_rule(rule, resource)
             
             # Deduplicate violations based on rule_id, file_path, and line_number
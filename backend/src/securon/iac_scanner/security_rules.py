@@ -1,20 +1,138 @@
 """Security rules for Terraform resource analysis"""
 
+import json
 import re
-import uuid
 from datetime import datetime
-from typing import List, Dict, Any, Optional, Callable
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Callable, FrozenSet
 from dataclasses import dataclass
 
 from ..interfaces.iac_scanner import SecurityRule, ScanResult
 from ..interfaces.core_types import Severity, RuleSource, RuleStatus, TerraformResource
 
 
+# Comprehensive rule definitions shipped with the backend
+_RULES_FILE = Path(__file__).resolve().parents[3] / "data" / "rules" / "comprehensive_rules.json"
+
+# S3 public access block settings that must all be enabled
+_PAB_SETTINGS = (
+    "block_public_acls",
+    "block_public_policy",
+    "ignore_public_acls",
+    "restrict_public_buckets",
+)
+
+# Ports that must never be exposed to 0.0.0.0/0, mapped to (service, rule_id)
+_DANGEROUS_PORTS = {
+    22: ("SSH", "sg-001"),
+    3389: ("RDP", "sg-002"),
+    3306: ("MySQL", "sg-003"),
+    5432: ("PostgreSQL", "sg-003"),
+    1433: ("MSSQL", "sg-003"),
+    27017: ("MongoDB", "sg-003"),
+}
+
+
+def _ec2_public_ip(config: Dict[str, Any], resource: TerraformResource) -> Optional[ScanResult]:
+    """Flag EC2 instances with a public IP assigned"""
+    if config.get("associate_public_ip_address") is not True:
+        return None
+    return ScanResult(
+        severity=Severity.MEDIUM,
+        rule_id="ec2-001",
+        description="EC2 instance has public IP assigned",
+        file_path=resource.file_path,
+        line_number=resource.line_number,
+        remediation="Use private subnets and NAT gateway for outbound access"
+    )
+
+
+def _ec2_unencrypted_root(config: Dict[str, Any], resource: TerraformResource) -> Optional[ScanResult]:
+    """Flag EC2 instances with an unencrypted root EBS volume"""
+    root_block_device = config.get("root_block_device", {})
+    if not isinstance(root_block_device, dict) or root_block_device.get("encrypted") is not False:
+        return None
+    return ScanResult(
+        severity=Severity.MEDIUM,
+        rule_id="ec2-002",
+        description="EC2 instance has unencrypted root EBS volume",
+        file_path=resource.file_path,
+        line_number=resource.line_number,
+        remediation="Enable EBS encryption for data at rest protection"
+    )
+
+
+def _ec2_imdsv1(config: Dict[str, Any], resource: TerraformResource) -> Optional[ScanResult]:
+    """Flag EC2 instances that still allow IMDSv1"""
+    metadata_options = config.get("metadata_options", {})
+    if not isinstance(metadata_options, dict) or metadata_options.get("http_tokens") != "optional":
+        return None
+    return ScanResult(
+        severity=Severity.MEDIUM,
+        rule_id="ec2-003",
+        description="EC2 instance allows IMDSv1 which is vulnerable to SSRF",
+        file_path=resource.file_path,
+        line_number=resource.line_number,
+        remediation="Set http_tokens to 'required' to enforce IMDSv2"
+    )
+
+
+def _rds_public(config: Dict[str, Any], resource: TerraformResource) -> Optional[ScanResult]:
+    """Flag publicly accessible RDS instances"""
+    if config.get("publicly_accessible") is not True:
+        return None
+    return ScanResult(
+        severity=Severity.HIGH,
+        rule_id="rds-001",
+        description="RDS instance is publicly accessible",
+        file_path=resource.file_path,
+        line_number=resource.line_number,
+        remediation="Set publicly_accessible to false"
+    )
+
+
+def _rds_encryption(config: Dict[str, Any], resource: TerraformResource) -> Optional[ScanResult]:
+    """Flag RDS instances without encryption at rest"""
+    if config.get("storage_encrypted") is not False:
+        return None
+    return ScanResult(
+        severity=Severity.HIGH,
+        rule_id="rds-002",
+        description="RDS instance does not have encryption at rest enabled",
+        file_path=resource.file_path,
+        line_number=resource.line_number,
+        remediation="Enable storage encryption using KMS"
+    )
+
+
+def _rds_backup(config: Dict[str, Any], resource: TerraformResource) -> Optional[ScanResult]:
+    """Flag RDS instances with automated backups disabled"""
+    if config.get("backup_retention_period", 0) != 0:
+        return None
+    return ScanResult(
+        severity=Severity.MEDIUM,
+        rule_id="rds-003",
+        description="RDS instance has automated backups disabled",
+        file_path=resource.file_path,
+        line_number=resource.line_number,
+        remediation="Set backup retention period to at least 7 days"
+    )
+
+
 @dataclass
 class RuleCheck:
     """Represents a security rule check function"""
     rule_id: str
     check_function: Callable[[TerraformResource], List[ScanResult]]
+    # Resource types the check can report on; None means any type
+    resource_types: Optional[FrozenSet[str]] = None
+
+
+_S3_TYPES = frozenset({"aws_s3_bucket", "aws_s3_bucket_acl", "aws_s3_bucket_public_access_block"})
+_SG_TYPES = frozenset({"aws_security_group"})
+_EC2_TYPES = frozenset({"aws_instance"})
+_RDS_TYPES = frozenset({"aws_db_instance", "aws_rds_cluster"})
+_IAM_TYPES = frozenset({"aws_iam_policy", "aws_iam_role_policy", "aws_iam_role"})
 
 
 class SecurityRuleEngine:
@@ -35,6 +153,17 @@ class SecurityRuleEngine:
             # Use pattern-based matching for dynamic rules
             return self._check_pattern_rule(rule, resource)
     
+    def get_rule_resource_types(self, rule: SecurityRule) -> Optional[FrozenSet[str]]:
+        """Return the resource types a rule can match, or None if it may match any"""
+        if rule.id in self.rule_checks:
+            return self.rule_checks[rule.id].resource_types
+        
+        if rule.pattern.startswith("resource_type:"):
+            return frozenset({rule.pattern.split(":", 1)[1].strip()})
+        
+        # Config and free-form regex patterns can match any resource type
+        return None
+    
     def _check_pattern_rule(self, rule: SecurityRule, resource: TerraformResource) -> List[ScanResult]:
         """Check a rule using pattern matching"""
         violations = []
@@ -107,7 +236,7 @@ class SecurityRuleEngine:
         
         # Enhanced S3 security checks
         def check_s3_security(resource: TerraformResource) -> List[ScanResult]:
-            if resource.type not in ["aws_s3_bucket", "aws_s3_bucket_acl", "aws_s3_bucket_public_access_block"]:
+            if resource.type not in _S3_TYPES:
                 return []
             
             violations = []
@@ -129,167 +258,93 @@ class SecurityRuleEngine:
             
             # S3 public access block checks
             if resource.type == "aws_s3_bucket_public_access_block":
-                pab_settings = ["block_public_acls", "block_public_policy", "ignore_public_acls", "restrict_public_buckets"]
-                for setting in pab_settings:
-                    if config.get(setting) is False:
-                        violations.append(ScanResult(
-                            severity=Severity.HIGH,
-                            rule_id="s3-007",
-                            description=f"S3 bucket public access block has {setting} disabled",
-                            file_path=resource.file_path,
-                            line_number=resource.line_number,
-                            remediation="Enable all public access block settings"
-                        ))
+                violations.extend(
+                    ScanResult(
+                        severity=Severity.HIGH,
+                        rule_id="s3-007",
+                        description=f"S3 bucket public access block has {setting} disabled",
+                        file_path=resource.file_path,
+                        line_number=resource.line_number,
+                        remediation="Enable all public access block settings"
+                    )
+                    for setting in _PAB_SETTINGS
+                    if config.get(setting) is False
+                )
             
             return violations
         
         # Enhanced Security Group checks
         def check_security_group(resource: TerraformResource) -> List[ScanResult]:
-            if resource.type != "aws_security_group":
+            if resource.type not in _SG_TYPES:
                 return []
             
             violations = []
             config = resource.configuration
             
-            # Check ingress rules for dangerous ports
+            # Ingress rules are normalized to a list of dicts by the parser
             ingress_rules = config.get("ingress", [])
-            if not isinstance(ingress_rules, list):
-                ingress_rules = [ingress_rules]
-            
-            dangerous_ports = {
-                22: ("SSH", "sg-001"),
-                3389: ("RDP", "sg-002"),
-                3306: ("MySQL", "sg-003"),
-                5432: ("PostgreSQL", "sg-003"),
-                1433: ("MSSQL", "sg-003"),
-                27017: ("MongoDB", "sg-003")
-            }
             
             for rule in ingress_rules:
-                if isinstance(rule, dict):
-                    cidr_blocks = rule.get("cidr_blocks", [])
-                    from_port = rule.get("from_port")
-                    to_port = rule.get("to_port")
-                    
-                    if "0.0.0.0/0" in cidr_blocks:
-                        # Check for specific dangerous ports
-                        for port, (service, rule_id) in dangerous_ports.items():
-                            if (from_port == port or to_port == port or 
-                                (from_port <= port <= to_port if from_port and to_port else False)):
-                                violations.append(ScanResult(
-                                    severity=Severity.CRITICAL,
-                                    rule_id=rule_id,
-                                    description=f"Security group allows {service} (port {port}) from 0.0.0.0/0",
-                                    file_path=resource.file_path,
-                                    line_number=resource.line_number,
-                                    remediation=f"Restrict {service} access to specific IP ranges"
-                                ))
-                        
-                        # General unrestricted access check
-                        if from_port == 0 and to_port == 65535:
+                cidr_blocks = rule.get("cidr_blocks", [])
+                from_port = rule.get("from_port")
+                to_port = rule.get("to_port")
+                
+                if "0.0.0.0/0" in cidr_blocks:
+                    # Check for specific dangerous ports
+                    for port, (service, rule_id) in _DANGEROUS_PORTS.items():
+                        if (from_port == port or to_port == port or 
+                            (from_port <= port <= to_port if from_port and to_port else False)):
                             violations.append(ScanResult(
                                 severity=Severity.CRITICAL,
-                                rule_id="sg-004",
-                                description="Security group allows all traffic from 0.0.0.0/0",
+                                rule_id=rule_id,
+                                description=f"Security group allows {service} (port {port}) from 0.0.0.0/0",
                                 file_path=resource.file_path,
                                 line_number=resource.line_number,
-                                remediation="Define specific port ranges and protocols"
+                                remediation=f"Restrict {service} access to specific IP ranges"
                             ))
+                    
+                    # General unrestricted access check
+                    if from_port == 0 and to_port == 65535:
+                        violations.append(ScanResult(
+                            severity=Severity.CRITICAL,
+                            rule_id="sg-004",
+                            description="Security group allows all traffic from 0.0.0.0/0",
+                            file_path=resource.file_path,
+                            line_number=resource.line_number,
+                            remediation="Define specific port ranges and protocols"
+                        ))
             
             return violations
         
         # Enhanced EC2 security checks
         def check_ec2_security(resource: TerraformResource) -> List[ScanResult]:
-            if resource.type != "aws_instance":
+            if resource.type not in _EC2_TYPES:
                 return []
             
-            violations = []
             config = resource.configuration
-            
-            # Check for public IP assignment
-            if config.get("associate_public_ip_address") is True:
-                violations.append(ScanResult(
-                    severity=Severity.MEDIUM,
-                    rule_id="ec2-001",
-                    description="EC2 instance has public IP assigned",
-                    file_path=resource.file_path,
-                    line_number=resource.line_number,
-                    remediation="Use private subnets and NAT gateway for outbound access"
-                ))
-            
-            # Check EBS encryption
-            root_block_device = config.get("root_block_device", {})
-            if isinstance(root_block_device, dict) and root_block_device.get("encrypted") is False:
-                violations.append(ScanResult(
-                    severity=Severity.MEDIUM,
-                    rule_id="ec2-002",
-                    description="EC2 instance has unencrypted root EBS volume",
-                    file_path=resource.file_path,
-                    line_number=resource.line_number,
-                    remediation="Enable EBS encryption for data at rest protection"
-                ))
-            
-            # Check IMDS configuration
-            metadata_options = config.get("metadata_options", {})
-            if isinstance(metadata_options, dict):
-                if metadata_options.get("http_tokens") == "optional":
-                    violations.append(ScanResult(
-                        severity=Severity.MEDIUM,
-                        rule_id="ec2-003",
-                        description="EC2 instance allows IMDSv1 which is vulnerable to SSRF",
-                        file_path=resource.file_path,
-                        line_number=resource.line_number,
-                        remediation="Set http_tokens to 'required' to enforce IMDSv2"
-                    ))
-            
-            return violations
+            checks = (
+                _ec2_public_ip(config, resource),
+                _ec2_unencrypted_root(config, resource),
+                _ec2_imdsv1(config, resource),
+            )
+            return [violation for violation in checks if violation is not None]
         
         # Enhanced RDS security checks
         def check_rds_security(resource: TerraformResource) -> List[ScanResult]:
-            if resource.type not in ["aws_db_instance", "aws_rds_cluster"]:
+            if resource.type not in _RDS_TYPES:
                 return []
             
-            violations = []
             config = resource.configuration
-            
-            # Public access check
-            if config.get("publicly_accessible") is True:
-                violations.append(ScanResult(
-                    severity=Severity.HIGH,
-                    rule_id="rds-001",
-                    description="RDS instance is publicly accessible",
-                    file_path=resource.file_path,
-                    line_number=resource.line_number,
-                    remediation="Set publicly_accessible to false"
-                ))
-            
-            # Encryption check
-            if config.get("storage_encrypted") is False:
-                violations.append(ScanResult(
-                    severity=Severity.HIGH,
-                    rule_id="rds-002",
-                    description="RDS instance does not have encryption at rest enabled",
-                    file_path=resource.file_path,
-                    line_number=resource.line_number,
-                    remediation="Enable storage encryption using KMS"
-                ))
-            
-            # Backup check
-            if config.get("backup_retention_period", 0) == 0:
-                violations.append(ScanResult(
-                    severity=Severity.MEDIUM,
-                    rule_id="rds-003",
-                    description="RDS instance has automated backups disabled",
-                    file_path=resource.file_path,
-                    line_number=resource.line_number,
-                    remediation="Set backup retention period to at least 7 days"
-                ))
-            
-            return violations
+            checks = (
+                _rds_public(config, resource),
+                _rds_encryption(config, resource),
+                _rds_backup(config, resource),
+            )
+            return [violation for violation in checks if violation is not None]
         
         # Enhanced IAM security checks
         def check_iam_security(resource: TerraformResource) -> List[ScanResult]:
-            if resource.type not in ["aws_iam_policy", "aws_iam_role_policy", "aws_iam_role"]:
+            if resource.type not in _IAM_TYPES:
                 return []
             
             violations = []
@@ -324,32 +379,32 @@ class SecurityRuleEngine:
             return violations
         
         # Register enhanced checks
-        self.rule_checks["s3-security"] = RuleCheck("s3-security", check_s3_security)
-        self.rule_checks["sg-security"] = RuleCheck("sg-security", check_security_group)
-        self.rule_checks["ec2-security"] = RuleCheck("ec2-security", check_ec2_security)
-        self.rule_checks["rds-security"] = RuleCheck("rds-security", check_rds_security)
-        self.rule_checks["iam-security"] = RuleCheck("iam-security", check_iam_security)
+        self.rule_checks["s3-security"] = RuleCheck("s3-security", check_s3_security, _S3_TYPES)
+        self.rule_checks["sg-security"] = RuleCheck("sg-security", check_security_group, _SG_TYPES)
+        self.rule_checks["ec2-security"] = RuleCheck("ec2-security", check_ec2_security, _EC2_TYPES)
+        self.rule_checks["rds-security"] = RuleCheck("rds-security", check_rds_security, _RDS_TYPES)
+        self.rule_checks["iam-security"] = RuleCheck("iam-security", check_iam_security, _IAM_TYPES)
         
         # Register comprehensive rule IDs to use the same check functions
         # S3 rules
         for rule_id in ["s3-001", "s3-002", "s3-003", "s3-004", "s3-005", "s3-006", "s3-007"]:
-            self.rule_checks[rule_id] = RuleCheck(rule_id, check_s3_security)
+            self.rule_checks[rule_id] = RuleCheck(rule_id, check_s3_security, _S3_TYPES)
         
         # Security Group rules
         for rule_id in ["sg-001", "sg-002", "sg-003", "sg-004", "sg-005"]:
-            self.rule_checks[rule_id] = RuleCheck(rule_id, check_security_group)
+            self.rule_checks[rule_id] = RuleCheck(rule_id, check_security_group, _SG_TYPES)
         
         # EC2 rules
         for rule_id in ["ec2-001", "ec2-002", "ec2-003", "ec2-004", "ec2-005"]:
-            self.rule_checks[rule_id] = RuleCheck(rule_id, check_ec2_security)
+            self.rule_checks[rule_id] = RuleCheck(rule_id, check_ec2_security, _EC2_TYPES)
         
         # RDS rules
         for rule_id in ["rds-001", "rds-002", "rds-003", "rds-004", "rds-005"]:
-            self.rule_checks[rule_id] = RuleCheck(rule_id, check_rds_security)
+            self.rule_checks[rule_id] = RuleCheck(rule_id, check_rds_security, _RDS_TYPES)
         
         # IAM rules
         for rule_id in ["iam-001", "iam-002", "iam-003", "iam-004", "iam-005", "iam-006"]:
-            self.rule_checks[rule_id] = RuleCheck(rule_id, check_iam_security)
+            self.rule_checks[rule_id] = RuleCheck(rule_id, check_iam_security, _IAM_TYPES)
     
     def _check_iam_wildcards(self, policy: Any) -> bool:
         """Check if IAM policy contains wildcards"""
@@ -361,19 +416,9 @@ class SecurityRuleEngine:
     
     def _has_wildcard_resources(self, policy_doc: Dict[str, Any]) -> bool:
         """Check if IAM policy document has wildcard resources"""
-        statements = policy_doc.get("Statement", [])
-        if not isinstance(statements, list):
-            statements = [statements]
-        
-        for statement in statements:
-            if isinstance(statement, dict):
-                resources = statement.get("Resource", [])
-                if isinstance(resources, str):
-                    resources = [resources]
-                
-                for resource in resources:
-                    if resource == "*":
-                        return True
+        for statement in policy_doc.get("Statement", []):
+            if "*" in statement.get("Resource", []):
+                return True
         return False
     
     def _check_cross_account_trust(self, assume_role_policy: Any) -> bool:
@@ -381,38 +426,21 @@ class SecurityRuleEngine:
         if isinstance(assume_role_policy, str):
             return "arn:aws:iam::" in assume_role_policy and "Condition" not in assume_role_policy
         elif isinstance(assume_role_policy, dict):
-            statements = assume_role_policy.get("Statement", [])
-            if not isinstance(statements, list):
-                statements = [statements]
-            
-            for statement in statements:
-                if isinstance(statement, dict):
-                    principal = statement.get("Principal", {})
-                    if isinstance(principal, dict):
-                        aws_principals = principal.get("AWS", [])
-                        if isinstance(aws_principals, str):
-                            aws_principals = [aws_principals]
-                        
-                        for aws_principal in aws_principals:
-                            if "arn:aws:iam::" in aws_principal and statement.get("Condition") is None:
-                                return True
+            for statement in assume_role_policy.get("Statement", []):
+                if statement.get("Condition") is not None:
+                    continue
+                
+                for aws_principal in statement.get("Principal", {}).get("AWS", []):
+                    if "arn:aws:iam::" in aws_principal:
+                        return True
         return False
     
     def _has_wildcard_actions(self, policy_doc: Dict[str, Any]) -> bool:
         """Check if IAM policy document has wildcard actions"""
-        statements = policy_doc.get("Statement", [])
-        if not isinstance(statements, list):
-            statements = [statements]
-        
-        for statement in statements:
-            if isinstance(statement, dict):
-                actions = statement.get("Action", [])
-                if isinstance(actions, str):
-                    actions = [actions]
-                
-                for action in actions:
-                    if action == "*" or action.endswith(":*"):
-                        return True
+        for statement in policy_doc.get("Statement", []):
+            for action in statement.get("Action", []):
+                if action == "*" or action.endswith(":*"):
+                    return True
         
         return False
 
@@ -423,31 +451,25 @@ class DefaultSecurityRules:
     @staticmethod
     def get_default_rules() -> List[SecurityRule]:
         """Get the default set of security rules"""
-        import json
-        import os
-        from pathlib import Path
-        
         # Load comprehensive rules from JSON file
-        rules_file = Path(__file__).parent.parent.parent.parent / "data" / "rules" / "comprehensive_rules.json"
-        
-        if not rules_file.exists():
+        if not _RULES_FILE.exists():
             # Fallback to basic rules if comprehensive rules file doesn't exist
             return DefaultSecurityRules._get_basic_rules()
         
         try:
-            with open(rules_file, 'r') as f:
+            with open(_RULES_FILE, 'r') as f:
                 rules_data = json.load(f)
             
+            # Map severity string to enum
+            severity_map = {
+                "LOW": Severity.LOW,
+                "MEDIUM": Severity.MEDIUM,
+                "HIGH": Severity.HIGH,
+                "CRITICAL": Severity.CRITICAL
+            }
+            
             rules = []
             for rule_data in rules_data.get("rules", []):
-                # Map severity string to enum
-                severity_map = {
-                    "LOW": Severity.LOW,
-                    "MEDIUM": Severity.MEDIUM,
-                    "HIGH": Severity.HIGH,
-                    "CRITICAL": Severity.CRITICAL
-                }
-                
                 rule = SecurityRule(
                     id=rule_data["id"],
                     name=rule_data["name"],
@@ -2,8 +2,9 @@
 
 from datetime import datetime
 from enum import Enum
-from typing import Any, Dict, List, Optional
-from pydantic import BaseModel
+from functools import cached_property
+from typing import Any, Callable, Dict, List, Optional, Union
+from pydantic import BaseModel, ConfigDict, PrivateAttr, computed_field
 
 
 class Severity(str, Enum):
@@ -47,7 +48,15 @@ class TimeRange(BaseModel):
     end: datetime
 
 
+# Per-log and per-anomaly models are built once and never mutated afterwards;
+# freezing them lets batches, caches and downstream components share
+# instances safely.
+_IMMUTABLE_RECORD = ConfigDict(extra='ignore', frozen=True, validate_assignment=False)
+
+
 class NormalizedLogEntry(BaseModel):
+    model_config = _IMMUTABLE_RECORD
+    
     timestamp: datetime
     source_ip: str
     destination_ip: Optional[str] = None
@@ -60,6 +69,8 @@ class NormalizedLogEntry(BaseModel):
 
 
 class CloudLog(BaseModel):
+    model_config = _IMMUTABLE_RECORD
+    
     timestamp: datetime
     source: LogSource
     raw_data: Dict[str, Any]
@@ -67,6 +78,8 @@ class CloudLog(BaseModel):
 
 
 class AnomalyPattern(BaseModel):
+    model_config = _IMMUTABLE_RECORD
+    
     feature: str
     expected_range: tuple[float, float]
     actual_value: float
@@ -74,13 +87,38 @@ class AnomalyPattern(BaseModel):
 
 
 class Explanation(BaseModel):
+    """Human-readable account of an anomaly
+    
+    technical_details may be passed as text or as a callable that renders
+    it; a callable runs once, on first read or serialization, so callers
+    that only need risk_level or recommended_actions never format it.
+    """
     summary: str
-    technical_details: str
     risk_level: Severity
     recommended_actions: List[str]
+    
+    _technical_details: Union[str, Callable[[], str]] = PrivateAttr(default='')
+    
+    def __init__(self, technical_details: Union[str, Callable[[], str]] = '', **data: Any):
+        super().__init__(**data)
+        self._technical_details = technical_details
+    
+    @computed_field
+    @cached_property
+    def technical_details(self) -> str:
+        details = self._technical_details
+        return details if isinstance(details, str) else details()
 
 
 class TerraformResource(BaseModel):
+    """Parsed Terraform resource.
+
+    The parser normalizes ``configuration`` so that ``ingress`` is always a
+    list of dicts and inline policy documents carry list-valued
+    ``Statement``, ``Action``, ``Resource`` and ``Principal.AWS`` fields.
+    """
+    model_config = _IMMUTABLE_RECORD
+    
     type: str
     name: str
     configuration: Dict[str, Any]
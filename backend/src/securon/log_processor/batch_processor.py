@@ -1,13 +1,49 @@
 """Batch processing functionality for handling large log datasets"""
 
 import asyncio
-from typing import Any, AsyncGenerator, Dict, List, Optional, Callable
+from collections import deque
+from typing import Any, AsyncGenerator, AsyncIterator, BinaryIO, Callable, Deque, Dict, Iterator, List, Optional, Set
 from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 import json
+import logging
+
+try:
+    import ijson
+    IJSON_AVAILABLE = True
+except ImportError:
+    IJSON_AVAILABLE = False
+    ijson = None
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+    orjson = None
 
 from ..interfaces.core_types import CloudLog, LogSource
 from .normalizer import LogNormalizer
-from .validator import LogValidator
+from .validator import LogValidator, ValidationError
+
+logger = logging.getLogger(__name__)
+
+# orjson.JSONDecodeError subclasses json.JSONDecodeError, so callers keep
+# catching the stdlib exception regardless of which parser is active
+_json_loads = orjson.loads if ORJSON_AVAILABLE else json.loads
+
+# Raised when a "[..." file turns out not to be a JSON array; ijson's
+# errors derive from Exception, not ValueError like json's and orjson's
+_JSON_ARRAY_ERRORS = (ValueError, ijson.JSONError) if IJSON_AVAILABLE else (ValueError,)
+
+# Only lines opening with one of these can hold a JSON record; anything else
+# (VPC flow rows, plain text) is wrapped without a doomed decode attempt
+_JSON_OPENERS = (b'{', b'[')
+
+# How much of a log file is inspected when sniffing its source type
+_SOURCE_SNIFF_BYTES = 64 * 1024
+
+_LOG_SOURCE_NAMES = frozenset(source.value for source in LogSource)
 
 
 class BatchProcessor:
@@ -18,6 +54,20 @@ class BatchProcessor:
         self.max_workers = max_workers
         self.normalizer = LogNormalizer()
         self.validator = LogValidator()
+        # Shared across batches; threads are only spawned on first use
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="securon-batch"
+        )
+    
+    async def __aenter__(self) -> "BatchProcessor":
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        self.close()
+    
+    def close(self) -> None:
+        """Shut down the worker thread pool"""
+        self._executor.shutdown(wait=True)
     
     async def process_logs_from_file(
         self, 
@@ -29,15 +79,24 @@ class BatchProcessor:
         Process logs from a file in batches
         Yields batches of processed CloudLog objects
         """
-        total_processed = 0
-        
-        async for batch in self._read_file_in_batches(file_path):
-            processed_batch = await self._process_batch(batch, source)
-            total_processed += len(processed_batch)
-            
-            if progress_callback:
-                progress_callback(total_processed, len(processed_batch))
-            
+        async for processed_batch in self._process_pipelined(
+            self._read_file_in_batches(file_path), source, progress_callback
+        ):
+            yield processed_batch
+    
+    async def process_logs_from_fileobj(
+        self,
+        file: BinaryIO,
+        source: LogSource,
+        progress_callback: Optional[Callable[[int, int], None]] = None
+    ) -> AsyncGenerator[List[CloudLog], None]:
+        """
+        Process logs from an already-open binary file in batches
+        The file is read from its start; the caller keeps ownership of it
+        """
+        async for processed_batch in self._process_pipelined(
+            self._read_fileobj_in_batches(file), source, progress_callback
+        ):
             yield processed_batch
     
     async def process_logs_from_data(
@@ -50,11 +109,52 @@ class BatchProcessor:
         Process logs from in-memory data in batches
         Yields batches of processed CloudLog objects
         """
+        async for processed_batch in self._process_pipelined(
+            self._slice_batches(logs), source, progress_callback
+        ):
+            yield processed_batch
+    
+    async def _slice_batches(self, logs: List[Dict[str, Any]]) -> AsyncGenerator[List[Dict[str, Any]], None]:
+        """Split in-memory logs into batch_size chunks"""
+        for i in range(0, len(logs), self.batch_size):
+            yield logs[i:i + self.batch_size]
+    
+    async def _process_pipelined(
+        self,
+        batches: AsyncIterator[List[Dict[str, Any]]],
+        source: LogSource,
+        progress_callback: Optional[Callable[[int, int], None]] = None
+    ) -> AsyncGenerator[List[CloudLog], None]:
+        """
+        Keep up to max_workers batches in flight on the thread pool while
+        yielding processed batches in their original order
+        """
+        # Bind the executor and worker function once per pipeline rather
+        # than rebuilding the call for every batch
+        submit = partial(
+            asyncio.get_running_loop().run_in_executor,
+            self._executor,
+            self._process_batch_sync,
+        )
+        pending: Deque["asyncio.Future[List[CloudLog]]"] = deque()
+        batch_iterator = batches.__aiter__()
+        exhausted = False
         total_processed = 0
         
-        for i in range(0, len(logs), self.batch_size):
-            batch = logs[i:i + self.batch_size]
-            processed_batch = await self._process_batch(batch, source)
+        while True:
+            # Fill the window before waiting on the oldest batch
+            while not exhausted and len(pending) < self.max_workers:
+                try:
+                    batch = await batch_iterator.__anext__()
+                except StopAsyncIteration:
+                    exhausted = True
+                    break
+                pending.append(submit(batch, source))
+            
+            if not pending:
+                break
+            
+            processed_batch = await pending.popleft()
             total_processed += len(processed_batch)
             
             if progress_callback:
@@ -65,92 +165,177 @@ class BatchProcessor:
     async def _process_batch(self, batch: List[Dict[str, Any]], source: LogSource) -> List[CloudLog]:
         """Process a single batch of logs"""
         # Run validation and normalization in thread pool to avoid blocking
-        loop = asyncio.get_event_loop()
+        return await asyncio.get_running_loop().run_in_executor(
+            self._executor, self._process_batch_sync, batch, source
+        )
+    
+    def _process_batch_sync(self, batch: List[Dict[str, Any]], source: LogSource) -> List[CloudLog]:
+        """
+        Validate, normalize and re-validate a batch in a single pass
         
-        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-            # Validate logs
-            valid_logs, validation_errors = await loop.run_in_executor(
-                executor, self.validator.validate_raw_logs, batch, source
-            )
-            
-            if validation_errors:
-                print(f"Validation errors in batch: {len(validation_errors)} errors")
+        Each log goes through all three stages before the next one is touched,
+        instead of the batch being walked once per stage: raw validation feeds
+        the normalizer's streaming iter_normalize_logs (and so its VPC Flow
+        batch path), whose output is re-validated as it is yielded. The public
+        validate_raw_logs / normalize_logs / validate_normalized_logs methods
+        remain for callers that need a single stage.
+        """
+        validator = self.validator
+        validate_raw = validator._validators.get(source)
+        if validate_raw is None:
+            raise ValueError(f"Unsupported log source: {source}")
+        
+        validation_errors = 0
+        
+        def validated_raw_logs() -> Iterator[Dict[str, Any]]:
+            nonlocal validation_errors
+            for raw_log in batch:
+                try:
+                    validator._validate_raw_log(raw_log, source, validate_raw)
+                except ValidationError:
+                    validation_errors += 1
+                    continue
+                yield raw_log
+        
+        # Normalization errors are counted and reported by the normalizer
+        normalized_logs = self.normalizer.iter_normalize_logs(validated_raw_logs(), source)
+        
+        validate_normalized = validator._validate_normalized_log
+        is_valid_ip = validator._is_valid_ip
+        
+        # IPs repeat across a batch, so each distinct value is checked once
+        checked_ips: Set[Optional[str]] = set()
+        valid_ips: Set[str] = set()
+        
+        final_logs = []
+        final_errors = 0
+        
+        for cloud_log in normalized_logs:
+            normalized = cloud_log.normalized_data
+            for ip in (normalized.source_ip, normalized.destination_ip):
+                if ip not in checked_ips:
+                    checked_ips.add(ip)
+                    if is_valid_ip(ip):
+                        valid_ips.add(ip)
             
-            # Normalize valid logs
-            if valid_logs:
-                normalized_logs = await loop.run_in_executor(
-                    executor, self.normalizer.normalize_logs, valid_logs, source
-                )
-                
-                # Final validation of normalized logs
-                final_logs, final_errors = await loop.run_in_executor(
-                    executor, self.validator.validate_normalized_logs, normalized_logs
-                )
-                
-                if final_errors:
-                    print(f"Final validation errors: {len(final_errors)} errors")
-                
-                return final_logs
+            try:
+                validate_normalized(cloud_log, valid_ips)
+            except ValidationError:
+                final_errors += 1
+                continue
             
-            return []
+            final_logs.append(cloud_log)
+        
+        if logger.isEnabledFor(logging.DEBUG):
+            if validation_errors:
+                logger.debug("Validation errors in batch: %d errors", validation_errors)
+            if final_errors:
+                logger.debug("Final validation errors: %d errors", final_errors)
+        
+        return final_logs
     
     async def _read_file_in_batches(self, file_path: str) -> AsyncGenerator[List[Dict[str, Any]], None]:
         """Read a file in batches to manage memory usage"""
-        batch = []
-        
         try:
-            with open(file_path, 'r', encoding='utf-8') as file:
-                content = file.read().strip()
-                
-                # Try to parse entire content as JSON first (for JSON arrays)
-                try:
-                    json_data = json.loads(content)
-                    
-                    # Handle JSON array
-                    if isinstance(json_data, list):
-                        for log_entry in json_data:
-                            batch.append(log_entry)
-                            if len(batch) >= self.batch_size:
-                                yield batch
-                                batch = []
-                    # Handle single JSON object
-                    elif isinstance(json_data, dict):
-                        batch.append(json_data)
-                    
-                except json.JSONDecodeError:
-                    # Handle line-by-line format (JSONL or plain text)
-                    for line_num, line in enumerate(content.split('\n'), 1):
-                        line = line.strip()
-                        if not line:
-                            continue
-                        
-                        try:
-                            # Try to parse as JSON line
-                            log_entry = json.loads(line)
-                            batch.append(log_entry)
-                            
-                        except json.JSONDecodeError:
-                            # Handle non-JSON formats (like VPC Flow Logs)
-                            log_entry = {'message': line, 'line_number': line_num}
-                            batch.append(log_entry)
-                        
-                        if len(batch) >= self.batch_size:
-                            yield batch
-                            batch = []
-                        
-                        if len(batch) >= self.batch_size:
-                            yield batch
-                            batch = []
-                
-                # Yield remaining logs
-                if batch:
+            with open(file_path, 'rb') as file:
+                async for batch in self._read_fileobj_in_batches(file):
                     yield batch
-                    
         except FileNotFoundError:
             raise FileNotFoundError(f"Log file not found: {file_path}")
         except Exception as e:
             raise Exception(f"Error reading log file {file_path}: {str(e)}")
     
+    async def _read_fileobj_in_batches(self, file: BinaryIO) -> AsyncGenerator[List[Dict[str, Any]], None]:
+        """Read an open binary file in batches to manage memory usage"""
+        batch = []
+        
+        for log_entry in self._iter_log_entries(file):
+            batch.append(log_entry)
+            if len(batch) >= self.batch_size:
+                yield batch
+                batch = []
+        
+        # Yield remaining logs
+        if batch:
+            yield batch
+    
+    def _iter_log_entries(self, file: BinaryIO) -> Iterator[Dict[str, Any]]:
+        """Yield raw log entries from a JSON array, JSON object or line-based file"""
+        prefix = self._peek_prefix(file)
+        
+        if prefix in (b'[{', b'[]'):
+            # Stream JSON arrays of log objects item by item instead of
+            # loading the whole file; "[timestamp] ..." text falls through
+            yielded = False
+            try:
+                for log_entry in self._iter_json_array(file):
+                    yielded = True
+                    yield log_entry
+                return
+            except _JSON_ARRAY_ERRORS:
+                if yielded:
+                    raise
+        elif prefix.startswith(b'{'):
+            # A single (possibly pretty-printed) JSON object; JSONL falls through
+            first_line = file.readline()
+            try:
+                _json_loads(first_line)
+            except json.JSONDecodeError:
+                file.seek(0)
+                try:
+                    json_data = _json_loads(file.read())
+                except json.JSONDecodeError:
+                    json_data = None
+                if isinstance(json_data, dict):
+                    yield json_data
+                    return
+        
+        # Handle line-by-line format (JSONL or plain text)
+        yield from self._iter_json_lines(file)
+    
+    @staticmethod
+    def _peek_prefix(file: BinaryIO, length: int = 2) -> bytes:
+        """Return the first non-whitespace bytes of a binary file and rewind it"""
+        prefix = b''
+        while len(prefix) < length:
+            char = file.read(1)
+            if not char:
+                break
+            if not char.isspace():
+                prefix += char
+        file.seek(0)
+        return prefix
+    
+    @staticmethod
+    def _iter_json_array(file: BinaryIO) -> Iterator[Dict[str, Any]]:
+        """Yield the elements of a top-level JSON array"""
+        if IJSON_AVAILABLE:
+            yield from ijson.items(file, 'item', use_float=True)
+        else:
+            json_data = _json_loads(file.read())
+            if isinstance(json_data, list):
+                yield from json_data
+    
+    @staticmethod
+    def _iter_json_lines(file: BinaryIO) -> Iterator[Dict[str, Any]]:
+        """Yield one entry per non-empty line, wrapping non-JSON lines"""
+        file.seek(0)
+        for line_num, line in enumerate(file, 1):
+            line = line.strip()
+            if not line:
+                continue
+            
+            if line[:1] in _JSON_OPENERS:
+                try:
+                    # Try to parse as JSON line
+                    yield _json_loads(line)
+                    continue
+                except json.JSONDecodeError:
+                    pass
+            
+            # Handle non-JSON formats (like VPC Flow Logs)
+            yield {'message': line.decode('utf-8'), 'line_number': line_num}
+    
     def get_processing_stats(self) -> Dict[str, Any]:
         """Get processing statistics"""
         return {
@@ -183,15 +368,22 @@ class BatchLogProcessor:
         self.processor = BatchProcessor()
         self.normalizer = LogNormalizer()
     
+    def close(self) -> None:
+        """Release the underlying batch processor's worker threads"""
+        self.processor.close()
+    
     async def process_file(self, file_path: str) -> List[CloudLog]:
         """Process a log file and return all processed logs"""
         try:
-            # Try to detect log source from file content
-            source = await self._detect_log_source(file_path)
-            
-            all_logs = []
-            async for batch in self.processor.process_logs_from_file(file_path, source):
-                all_logs.extend(batch)
+            # Open once: sniff the source from the head, then stream the
+            # records from the same handle
+            with open(file_path, 'rb') as file:
+                source = self._detect_log_source_from_fileobj(file)
+                file.seek(0)
+                
+                all_logs = []
+                async for batch in self.processor.process_logs_from_fileobj(file, source):
+                    all_logs.extend(batch)
             
             return all_logs
         except Exception as e:
@@ -201,58 +393,76 @@ class BatchLogProcessor:
     async def _detect_log_source(self, file_path: str) -> LogSource:
         """Detect log source from file content"""
         try:
-            import json
-            with open(file_path, 'r', encoding='utf-8') as file:
-                content = file.read().strip()
-                
-                # Try to parse as JSON first
-                if content.startswith('[') or content.startswith('{'):
-                    try:
-                        data = json.loads(content)
-                        if isinstance(data, list) and len(data) > 0:
-                            first_entry = data[0]
-                        else:
-                            first_entry = data
-                        
-                        # Check the source field or content
-                        if isinstance(first_entry, dict):
-                            source = first_entry.get('source', '').upper()
-                            if source in ['VPC_FLOW', 'CLOUDTRAIL', 'IAM', 'WAF', 'ALB', 'CLOUDFRONT', 'LAMBDA', 'API_GATEWAY']:
-                                return LogSource[source]
-                            
-                            # Check raw_data for indicators
-                            raw_data = first_entry.get('raw_data', {})
-                            if 'srcaddr' in raw_data or 'dstaddr' in raw_data:
-                                return LogSource.VPC_FLOW
-                            elif 'eventName' in raw_data or 'eventSource' in raw_data:
-                                return LogSource.CLOUDTRAIL
-                            elif 'userIdentity' in raw_data:
-                                return LogSource.IAM
-                            elif 'httpRequest' in raw_data or 'action' in raw_data:
-                                return LogSource.WAF
-                            elif 'client_ip' in raw_data or 'target_ip' in raw_data:
-                                return LogSource.ALB
-                            elif 'c-ip' in raw_data or 'cs-method' in raw_data:
-                                return LogSource.CLOUDFRONT
-                            elif 'functionName' in raw_data:
-                                return LogSource.LAMBDA
-                            elif 'httpMethod' in raw_data or 'resourcePath' in raw_data:
-                                return LogSource.API_GATEWAY
-                    except json.JSONDecodeError:
-                        pass
-                
-                # Fallback to text-based detection
-                if 'vpc-flow' in content.lower() or 'srcaddr' in content.lower():
-                    return LogSource.VPC_FLOW
-                elif 'cloudtrail' in content.lower() or 'eventName' in content.lower():
-                    return LogSource.CLOUDTRAIL
-                elif 'iam' in content.lower() or 'userIdentity' in content.lower():
-                    return LogSource.IAM
-                else:
-                    return LogSource.VPC_FLOW  # Default
+            # The source signature is always present in the first record, so
+            # only the head of the file is inspected
+            with open(file_path, 'rb') as file:
+                return self._detect_log_source_from_fileobj(file)
         except:
             return LogSource.VPC_FLOW  # Default fallback
     
+    def _detect_log_source_from_fileobj(self, file: BinaryIO) -> LogSource:
+        """Detect log source from the head of an open binary file"""
+        try:
+            return self._detect_log_source_from_bytes(file.read(_SOURCE_SNIFF_BYTES))
+        except Exception:
+            return LogSource.VPC_FLOW  # Default fallback
+    
+    def _detect_log_source_from_bytes(self, head: bytes) -> LogSource:
+        """Detect log source from the leading bytes of a log file"""
+        first_entry = self._decode_first_entry(head)
+        
+        # Check the source field or content
+        if isinstance(first_entry, dict):
+            source = str(first_entry.get('source', '')).upper()
+            if source in _LOG_SOURCE_NAMES:
+                return LogSource[source]
+            
+            # Check raw_data for indicators
+            raw_data = first_entry.get('raw_data', {})
+            if 'srcaddr' in raw_data or 'dstaddr' in raw_data:
+                return LogSource.VPC_FLOW
+            elif 'eventName' in raw_data or 'eventSource' in raw_data:
+                return LogSource.CLOUDTRAIL
+            elif 'userIdentity' in raw_data:
+                return LogSource.IAM
+            elif 'httpRequest' in raw_data or 'action' in raw_data:
+                return LogSource.WAF
+            elif 'client_ip' in raw_data or 'target_ip' in raw_data:
+                return LogSource.ALB
+            elif 'c-ip' in raw_data or 'cs-method' in raw_data:
+                return LogSource.CLOUDFRONT
+            elif 'functionName' in raw_data:
+                return LogSource.LAMBDA
+            elif 'httpMethod' in raw_data or 'resourcePath' in raw_data:
+                return LogSource.API_GATEWAY
+        
+        # Fallback to text-based detection (markers are matched case-insensitively)
+        lowered = head.lower()
+        if b'vpc-flow' in lowered or b'srcaddr' in lowered:
+            return LogSource.VPC_FLOW
+        elif b'cloudtrail' in lowered or b'eventname' in lowered:
+            return LogSource.CLOUDTRAIL
+        elif b'iam' in lowered or b'useridentity' in lowered:
+            return LogSource.IAM
+        else:
+            return LogSource.VPC_FLOW  # Default
+    
+    @staticmethod
+    def _decode_first_entry(head: bytes) -> Any:
+        """Decode the first JSON value of a (possibly truncated) JSON/JSONL head"""
+        text = head.decode('utf-8', errors='ignore').lstrip()
+        if not text.startswith(('[', '{')):
+            return None
+        
+        decoder = json.JSONDecoder()
+        try:
+            if text.startswith('['):
+                position = len(text) - len(text[1:].lstrip())
+                return decoder.raw_decode(text, position)[0]
+            return decoder.raw_decode(text)[0]
+        except ValueError:
+            return None
+    
     async def _create_fallback_logs(self, file_path: str) -> List[CloudLog]:
         """Create basic CloudLog entries as fallback"""
         logs = []
@@ -263,10 +473,15 @@ class BatchLogProcessor:
                     if not line:
                         continue
                     
-                    try:
-                        # Try to parse as JSON
-                        raw_data = json.loads(line)
-                    except json.JSONDecodeError:
+                    raw_data = None
+                    if line[0] in '{[':
+                        try:
+                            # Try to parse as JSON
+                            raw_data = _json_loads(line)
+                        except json.JSONDecodeError:
+                            pass
+                    
+                    if raw_data is None:
                         # Create basic structure for non-JSON
                         raw_data = {'message': line, 'line_number': line_num}
                     
@@ -281,6 +496,6 @@ class BatchLogProcessor:
                     )
                     logs.append(log)
         except Exception as e:
-            print(f"Error creating fallback logs: {e}")
+            logger.warning("Error creating fallback logs: %s", e)
         
         return logs
\ No newline at end of file
@@ -1,7 +1,8 @@
 """Log validation utilities for ensuring data quality"""
 
+import socket
 from datetime import datetime
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
 
 from ..interfaces.core_types import CloudLog, LogSource, NormalizedLogEntry
 
@@ -14,6 +15,19 @@ class ValidationError(Exception):
 class LogValidator:
     """Validates log data for completeness and correctness"""
     
+    def __init__(self):
+        # Per-source validators, resolved once per batch rather than per log
+        self._validators = {
+            LogSource.VPC_FLOW: self._validate_vpc_flow_log,
+            LogSource.CLOUDTRAIL: self._validate_cloudtrail_log,
+            LogSource.IAM: self._validate_iam_log,
+            LogSource.WAF: self._validate_waf_log,
+            LogSource.ALB: self._validate_alb_log,
+            LogSource.CLOUDFRONT: self._validate_cloudfront_log,
+            LogSource.LAMBDA: self._validate_lambda_log,
+            LogSource.API_GATEWAY: self._validate_api_gateway_log,
+        }
+    
     def validate_raw_logs(self, logs: List[Dict[str, Any]], source: LogSource) -> Tuple[List[Dict[str, Any]], List[str]]:
         """
         Validate raw logs before normalization
@@ -21,10 +35,11 @@ class LogValidator:
         """
         valid_logs = []
         errors = []
+        validator = self._validators.get(source)
         
         for i, log in enumerate(logs):
             try:
-                self._validate_raw_log(log, source)
+                self._validate_raw_log(log, source, validator)
                 valid_logs.append(log)
             except ValidationError as e:
                 errors.append(f"Log {i}: {str(e)}")
@@ -39,38 +54,38 @@ class LogValidator:
         valid_logs = []
         errors = []
         
+        # Batches repeat the same handful of addresses, so validate the
+        # distinct values of the IP columns once instead of once per row
+        entries = [log.normalized_data for log in logs]
+        distinct_ips = {entry.source_ip for entry in entries}
+        distinct_ips.update(entry.destination_ip for entry in entries)
+        valid_ips = {ip for ip in distinct_ips if self._is_valid_ip(ip)}
+        
         for i, log in enumerate(logs):
             try:
-                self._validate_normalized_log(log)
+                self._validate_normalized_log(log, valid_ips)
                 valid_logs.append(log)
             except ValidationError as e:
                 errors.append(f"Log {i}: {str(e)}")
         
         return valid_logs, errors
     
-    def _validate_raw_log(self, log: Dict[str, Any], source: LogSource) -> None:
+    def _validate_raw_log(
+        self,
+        log: Dict[str, Any],
+        source: LogSource,
+        validator: Optional[Callable[[Dict[str, Any]], None]] = None
+    ) -> None:
         """Validate a single raw log based on its source type"""
         if not isinstance(log, dict):
             raise ValidationError("Log must be a dictionary")
         
-        if source == LogSource.VPC_FLOW:
-            self._validate_vpc_flow_log(log)
-        elif source == LogSource.CLOUDTRAIL:
-            self._validate_cloudtrail_log(log)
-        elif source == LogSource.IAM:
-            self._validate_iam_log(log)
-        elif source == LogSource.WAF:
-            self._validate_waf_log(log)
-        elif source == LogSource.ALB:
-            self._validate_alb_log(log)
-        elif source == LogSource.CLOUDFRONT:
-            self._validate_cloudfront_log(log)
-        elif source == LogSource.LAMBDA:
-            self._validate_lambda_log(log)
-        elif source == LogSource.API_GATEWAY:
-            self._validate_api_gateway_log(log)
-        else:
-            raise ValidationError(f"Unknown log source: {source}")
+        if validator is None:
+            validator = self._validators.get(source)
+            if validator is None:
+                raise ValidationError(f"Unknown log source: {source}")
+        
+        validator(log)
     
     def _validate_vpc_flow_log(self, log: Dict[str, Any]) -> None:
         """Validate VPC Flow Log structure"""
@@ -91,7 +106,7 @@ class LogValidator:
                 raise ValidationError(f"Missing required VPC Flow Log fields: {missing_fields}")
         
         # Check for timestamp
-        if not any(field in data for field in ['windowstart', 'start']) and 'timestamp' not in log:
+        if 'windowstart' not in data and 'start' not in data and 'timestamp' not in log:
             raise ValidationError("VPC Flow Log missing timestamp field")
     
     def _validate_cloudtrail_log(self, log: Dict[str, Any]) -> None:
@@ -99,13 +114,11 @@ class LogValidator:
         # Handle nested raw_data structure
         data = log.get('raw_data', log)
         
-        required_fields = ['eventName']
-        missing_fields = [field for field in required_fields if field not in data]
-        if missing_fields:
-            raise ValidationError(f"Missing required CloudTrail fields: {missing_fields}")
+        if 'eventName' not in data:
+            raise ValidationError("Missing required CloudTrail fields: ['eventName']")
         
         # Validate timestamp field exists
-        if not any(field in data for field in ['eventTime']) and 'timestamp' not in log:
+        if 'eventTime' not in data and 'timestamp' not in log:
             raise ValidationError("CloudTrail log missing timestamp field")
     
     def _validate_iam_log(self, log: Dict[str, Any]) -> None:
@@ -114,11 +127,11 @@ class LogValidator:
         data = log.get('raw_data', log)
         
         # Check for at least one timestamp field
-        if not any(field in data for field in ['eventTime']) and 'timestamp' not in log:
+        if 'eventTime' not in data and 'timestamp' not in log:
             raise ValidationError("IAM log missing timestamp field")
         
         # Check for at least one action field
-        if not any(field in data for field in ['eventName', 'action']):
+        if 'eventName' not in data and 'action' not in data:
             raise ValidationError("IAM log missing action field")
     
     def _validate_waf_log(self, log: Dict[str, Any]) -> None:
@@ -127,7 +140,7 @@ class LogValidator:
         data = log.get('raw_data', log)
         
         # Check for timestamp
-        if not any(field in data for field in ['timestamp']) and 'timestamp' not in log:
+        if 'timestamp' not in data and 'timestamp' not in log:
             raise ValidationError("WAF log missing timestamp field")
         
         # Check for httpRequest structure
@@ -148,11 +161,11 @@ class LogValidator:
         data = log.get('raw_data', log)
         
         # Check for timestamp
-        if not any(field in data for field in ['timestamp']) and 'timestamp' not in log:
+        if 'timestamp' not in data and 'timestamp' not in log:
             raise ValidationError("ALB log missing timestamp field")
         
         # Check for client IP (in various formats)
-        if not any(field in data for field in ['client_ip', 'message']):
+        if 'client_ip' not in data and 'message' not in data:
             raise ValidationError("ALB log missing client IP information")
     
     def _validate_cloudfront_log(self, log: Dict[str, Any]) -> None:
@@ -161,11 +174,11 @@ class LogValidator:
         data = log.get('raw_data', log)
         
         # Check for timestamp
-        if not any(field in data for field in ['timestamp']) and 'timestamp' not in log:
+        if 'timestamp' not in data and 'timestamp' not in log:
             raise ValidationError("CloudFront log missing timestamp field")
         
         # Check for client IP (CloudFront uses c-ip)
-        if not any(field in data for field in ['c-ip', 'client_ip']):
+        if 'c-ip' not in data and 'client_ip' not in data:
             raise ValidationError("CloudFront log missing client IP field")
     
     def _validate_lambda_log(self, log: Dict[str, Any]) -> None:
@@ -174,11 +187,11 @@ class LogValidator:
         data = log.get('raw_data', log)
         
         # Check for timestamp
-        if not any(field in data for field in ['timestamp']) and 'timestamp' not in log:
+        if 'timestamp' not in data and 'timestamp' not in log:
             raise ValidationError("Lambda log missing timestamp field")
         
         # Lambda logs should have function name or event name
-        if not any(field in data for field in ['functionName', 'eventName', 'resource']):
+        if 'functionName' not in data and 'eventName' not in data and 'resource' not in data:
             raise ValidationError("Lambda log missing function or event identification")
     
     def _validate_api_gateway_log(self, log: Dict[str, Any]) -> None:
@@ -187,53 +200,55 @@ class LogValidator:
         data = log.get('raw_data', log)
         
         # Check for timestamp
-        if not any(field in data for field in ['requestTime', 'timestamp']) and 'timestamp' not in log:
+        if 'requestTime' not in data and 'timestamp' not in data and 'timestamp' not in log:
             raise ValidationError("API Gateway log missing timestamp field")
         
         # Check for HTTP method or resource path
-        if not any(field in data for field in ['httpMethod', 'resourcePath', 'path']):
+        if 'httpMethod' not in data and 'resourcePath' not in data and 'path' not in data:
             raise ValidationError("API Gateway log missing HTTP method or resource path")
     
-    def _validate_normalized_log(self, log: CloudLog) -> None:
-        """Validate a normalized log entry"""
+    def _validate_normalized_log(self, log: CloudLog, valid_ips: Optional[Set[str]] = None) -> None:
+        """Validate a normalized log entry
+        
+        valid_ips, when given, holds the pre-validated IPs of the enclosing batch.
+        """
+        entry = log.normalized_data
+        
         if not isinstance(log.timestamp, datetime):
             raise ValidationError("Invalid timestamp in normalized log")
         
-        if not log.normalized_data.source_ip:
+        if not entry.source_ip:
             raise ValidationError("Missing source IP in normalized log")
         
-        if not log.normalized_data.action:
+        if not entry.action:
             raise ValidationError("Missing action in normalized log")
         
         # Validate IP address format (basic check)
-        if not self._is_valid_ip(log.normalized_data.source_ip):
-            raise ValidationError(f"Invalid source IP format: {log.normalized_data.source_ip}")
+        if valid_ips is None:
+            valid_ips = {ip for ip in (entry.source_ip, entry.destination_ip) if self._is_valid_ip(ip)}
+        
+        if entry.source_ip not in valid_ips:
+            raise ValidationError(f"Invalid source IP format: {entry.source_ip}")
         
-        if log.normalized_data.destination_ip and not self._is_valid_ip(log.normalized_data.destination_ip):
-            raise ValidationError(f"Invalid destination IP format: {log.normalized_data.destination_ip}")
+        if entry.destination_ip and entry.destination_ip not in valid_ips:
+            raise ValidationError(f"Invalid destination IP format: {entry.destination_ip}")
         
         # Validate port range
-        if log.normalized_data.port is not None:
-            if not (0 <= log.normalized_data.port <= 65535):
-                raise ValidationError(f"Invalid port number: {log.normalized_data.port}")
+        if entry.port is not None:
+            if not (0 <= entry.port <= 65535):
+                raise ValidationError(f"Invalid port number: {entry.port}")
     
     def _is_valid_ip(self, ip: str) -> bool:
         """Basic IP address validation"""
         if not ip or ip == '-':
             return False
         
-        # Simple IPv4 validation
-        parts = ip.split('.')
-        if len(parts) != 4:
-            return False
-        
+        # Strict dotted-quad IPv4 check done by libc; unlike inet_aton,
+        # inet_pton rejects shorthand forms such as "10.1"
         try:
-            for part in parts:
-                num = int(part)
-                if not (0 <= num <= 255):
-                    return False
+            socket.inet_pton(socket.AF_INET, ip)
             return True
-        except ValueError:
+        except (OSError, TypeError, ValueError):
             return False
     
     def get_validation_summary(self, total_logs: int, valid_logs: int, errors: List[str]) -> Dict[str, Any]:
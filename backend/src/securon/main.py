@@ -2,21 +2,18 @@
 
 import asyncio
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 
 from .interfaces import *
 from .platform import PlatformOrchestrator, PlatformConfig
 from .api.routes import router
 
-# Global platform orchestrator
-platform: PlatformOrchestrator = None
-
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan management"""
-    global platform
+    platform = None
     
     # Startup
     try:
@@ -70,9 +67,9 @@ async def root():
 
 
 @app.get("/health")
-async def health_check():
+async def health_check(request: Request):
     """Health check endpoint with platform status"""
-    global platform
+    platform = getattr(request.app.state, 'platform', None)
     
     if not platform or not platform.initialized:
         return {"status": "initializing"}
@@ -94,9 +91,9 @@ async def health_check():
 
 
 @app.get("/metrics")
-async def get_metrics():
+async def get_metrics(request: Request):
     """Get platform metrics"""
-    global platform
+    platform = getattr(request.app.state, 'platform', None)
     
     if not platform or not platform.initialized:
         return {"error": "Platform not initialized"}
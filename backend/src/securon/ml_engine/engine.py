@@ -1,12 +1,30 @@
 """ML Engine implementation with Isolation Forest algorithm"""
 
+import asyncio
+import os
+import random
+import re
+import shutil
+import tempfile
 import uuid
+import weakref
+from bisect import bisect_left
+from collections import Counter
 from datetime import datetime, timedelta
-from typing import List, Dict, Any
+from functools import lru_cache, partial
+from types import MappingProxyType
+from typing import List, Dict, Any, Optional, Tuple
+import joblib
 import numpy as np
 import pandas as pd
 from sklearn.ensemble import IsolationForest
 from sklearn.preprocessing import StandardScaler
+try:
+    import cuml
+    CUML_AVAILABLE = True
+except ImportError:
+    CUML_AVAILABLE = False
+    cuml = None
 
 from ..interfaces.ml_engine import MLEngine, AnomalyResult
 from ..interfaces.core_types import (
@@ -14,27 +32,366 @@ from ..interfaces.core_types import (
     TimeRange, Severity
 )
 from ..interfaces.iac_scanner import SecurityRule, RuleSource, RuleStatus
+from ..process_pool import get_process_pool
+
+
+def _hash_column(values: List[str], buckets: int) -> np.ndarray:
+    """Hash a column of strings into [0, buckets) in one vectorized pass
+    
+    Unlike the built-in hash(), pandas' hashing is not salted per process,
+    so the same value maps to the same bucket across runs and workers.
+    Log columns repeat a few values (IPs, users, actions), so only the
+    distinct values are hashed and the buckets are gathered by code.
+    """
+    codes, uniques = pd.factorize(np.asarray(values, dtype=object))
+    hashed = pd.util.hash_array(np.asarray(uniques, dtype=object), categorize=False)
+    return (hashed % np.uint64(buckets)).astype(np.int64)[codes]
+
+
+# _classify_anomaly_types codes, in ascending rule priority
+_ANOMALY_TYPE_BY_CODE = np.array([
+    AnomalyType.SUSPICIOUS_IP,
+    AnomalyType.UNUSUAL_API,
+    AnomalyType.PORT_SCAN,
+    AnomalyType.BRUTE_FORCE,
+], dtype=object)
+
+
+# Version/variant bits of a random (version 4) UUID
+_UUID4_CLEAR = ~((0xf000 << 64) | (0xc000 << 48))
+_UUID4_BITS = (0x4000 << 64) | (0x8000 << 48)
+
+# Private generator for anomaly ids, seeded from the OS. The global random
+# module state must not be used: a random.seed() anywhere in the process
+# would repeat ids across runs and collide on the ml_findings primary key.
+_ID_RNG = random.Random()
+if hasattr(os, 'register_at_fork'):
+    # Forked children would otherwise continue the parent's id sequence
+    os.register_at_fork(after_in_child=_ID_RNG.seed)
+
+
+def _new_anomaly_id() -> str:
+    """Random version-4 UUID string, without uuid4()'s urandom call
+    
+    Anomalies are created per flagged log, so their ids come from a
+    private OS-seeded generator. Rule ids, which are used to approve
+    rules, keep using uuid4().
+    """
+    h = '%032x' % (_ID_RNG.getrandbits(128) & _UUID4_CLEAR | _UUID4_BITS)
+    return f'{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}'
+
+
+def _average_path_length(n_samples: np.ndarray) -> np.ndarray:
+    """Expected path length of an unsuccessful BST search among n samples"""
+    n_samples = np.asarray(n_samples, dtype=np.float64)
+    lengths = np.zeros_like(n_samples)
+    lengths[n_samples == 2] = 1.0
+    large = n_samples > 2
+    n = n_samples[large]
+    lengths[large] = 2.0 * (np.log(n - 1.0) + np.euler_gamma) - 2.0 * (n - 1.0) / n
+    return lengths
+
+
+def _remove_dump_dir(path: str) -> None:
+    """Delete an engine's model dumps once the engine is garbage collected"""
+    shutil.rmtree(path, ignore_errors=True)
+
+
+# Per-tree estimators, feature indices and cached path lengths, plus the
+# forest's path length normalizer and offset: all that scoring needs
+_ScoringModel = Tuple[list, list, list, float, float]
+
+# Batches smaller than this are scored inline; shipping them to the
+# scoring pool costs more than it saves
+_POOL_MIN_ROWS = 20_000
+
+# Inside a worker: the last model loaded, as (dump path, model)
+_worker_model: Optional[Tuple[str, _ScoringModel]] = None
+
+
+def _score_samples(model: _ScoringModel, matrix: np.ndarray) -> np.ndarray:
+    """IsolationForest.decision_function, scored from cached path lengths"""
+    estimators, estimators_features, path_lengths, norm, offset = model
+    matrix = np.asarray(matrix, dtype=np.float32)
+    
+    depths = np.zeros(matrix.shape[0])
+    for estimator, features, lengths in zip(estimators, estimators_features, path_lengths):
+        tree_input = matrix if len(features) == matrix.shape[1] else matrix[:, features]
+        depths += lengths[estimator.apply(tree_input, check_input=False)]
+    
+    if norm == 0:
+        # Trained on a single sample: every score is 1, as in scikit-learn
+        scores = np.ones_like(depths)
+    else:
+        scores = 2 ** (-depths / norm)
+    return -scores - offset
+
+
+def _score_in_worker(model_path: str, matrix: np.ndarray) -> np.ndarray:
+    """Process-pool worker: score a batch against a dumped model"""
+    global _worker_model
+    if _worker_model is None or _worker_model[0] != model_path:
+        _worker_model = (model_path, joblib.load(model_path, mmap_mode='r'))
+    return _score_samples(_worker_model[1], matrix)
+
+
+# A score above _SEVERITY_THRESHOLDS[i - 1] (and at most the next threshold)
+# maps to _SEVERITY_LEVELS[i]
+_SEVERITY_THRESHOLDS = (0.4, 0.6, 0.8)
+_SEVERITY_LEVELS = (Severity.LOW, Severity.MEDIUM, Severity.HIGH, Severity.CRITICAL)
+
+
+def _severity_level(score: float) -> Severity:
+    """Map a 0-1 severity score to its Severity level"""
+    # bisect_left counts the thresholds strictly below the score
+    return _SEVERITY_LEVELS[bisect_left(_SEVERITY_THRESHOLDS, score)]
+
+
+# AnomalyPatterns are frozen, so anomalies share one instance per distinct
+# pattern instead of each allocating its own
+_GENERAL_BEHAVIOR_PATTERN = AnomalyPattern(
+    feature="general_behavior",
+    expected_range=(0.0, 1.0),
+    actual_value=0.0,
+    deviation=1.0
+)
+_AUTHENTICATION_FAILURE_PATTERN = AnomalyPattern(
+    feature="authentication_failure",
+    expected_range=(0.0, 0.1),
+    actual_value=1.0,
+    deviation=1.0
+)
+_ADMIN_ACCESS_PATTERN = AnomalyPattern(
+    feature="admin_access_attempt",
+    expected_range=(0.0, 0.1),
+    actual_value=1.0,
+    deviation=1.0
+)
+_GENERAL_SUSPICIOUS_PATTERN = AnomalyPattern(
+    feature="general_suspicious_behavior",
+    expected_range=(0.0, 0.5),
+    actual_value=1.0,
+    deviation=1.0
+)
+
+
+@lru_cache(maxsize=None)
+def _hour_of_day_pattern(hour: int) -> AnomalyPattern:
+    """Shared pattern for activity outside working hours"""
+    return AnomalyPattern(
+        feature="hour_of_day",
+        expected_range=(6.0, 22.0),
+        actual_value=float(hour),
+        deviation=abs(hour - 14.0) / 14.0
+    )
+
+
+@lru_cache(maxsize=4096)
+def _port_pattern(port: int) -> AnomalyPattern:
+    """Shared pattern for a privileged or very high port"""
+    return AnomalyPattern(
+        feature="port",
+        expected_range=(1024.0, 65000.0),
+        actual_value=float(port),
+        deviation=1.0 if port < 1024 else (port - 65000) / 65000
+    )
+
+
+@lru_cache(maxsize=None)
+def _suspicious_port_pattern(port: int) -> AnomalyPattern:
+    """Shared pattern for a port on the suspicious list"""
+    return AnomalyPattern(
+        feature="suspicious_port",
+        expected_range=(1024.0, 65535.0),
+        actual_value=float(port),
+        deviation=1.0
+    )
+
+
+# Candidate rule templates per anomaly type
+_RULE_CONFIGS = MappingProxyType({
+    AnomalyType.PORT_SCAN: {
+        'name': 'ML-Generated Port Scan Detection',
+        'description': 'Detect potential port scanning activities based on ML analysis',
+        'pattern': 'port_access_pattern_unusual',
+        'remediation': 'Review network access patterns and implement port access controls'
+    },
+    AnomalyType.BRUTE_FORCE: {
+        'name': 'ML-Generated Brute Force Detection',
+        'description': 'Detect potential brute force attacks based on ML analysis',
+        'pattern': 'authentication_failure_pattern',
+        'remediation': 'Implement account lockout policies and multi-factor authentication'
+    },
+    AnomalyType.SUSPICIOUS_IP: {
+        'name': 'ML-Generated Suspicious IP Detection',
+        'description': 'Detect suspicious IP activity based on ML analysis',
+        'pattern': 'ip_behavior_anomaly',
+        'remediation': 'Review IP access patterns and implement IP allowlisting'
+    },
+    AnomalyType.UNUSUAL_API: {
+        'name': 'ML-Generated Unusual API Detection',
+        'description': 'Detect unusual API behavior based on ML analysis',
+        'pattern': 'api_usage_anomaly',
+        'remediation': 'Review API access patterns and implement API rate limiting'
+    }
+})
+
+# Explanation summary per anomaly type
+_SUMMARIES = MappingProxyType({
+    AnomalyType.PORT_SCAN: "Potential port scanning activity detected",
+    AnomalyType.BRUTE_FORCE: "Potential brute force attack detected",
+    AnomalyType.SUSPICIOUS_IP: "Suspicious IP activity detected",
+    AnomalyType.UNUSUAL_API: "Unusual API behavior detected"
+})
+
+# Recommended actions per anomaly type; tuples, so an Explanation never
+# shares a mutable list with the table
+_ACTION_MAP = MappingProxyType({
+    AnomalyType.PORT_SCAN: (
+        "Review network access logs for the affected time period",
+        "Implement network segmentation to limit port access",
+        "Configure intrusion detection systems",
+        "Review firewall rules and access controls"
+    ),
+    AnomalyType.BRUTE_FORCE: (
+        "Review authentication logs for failed login attempts",
+        "Implement account lockout policies",
+        "Enable multi-factor authentication",
+        "Monitor for credential stuffing attacks"
+    ),
+    AnomalyType.SUSPICIOUS_IP: (
+        "Investigate the source IP address",
+        "Review geolocation and reputation of the IP",
+        "Implement IP-based access controls",
+        "Monitor for additional suspicious activity"
+    ),
+    AnomalyType.UNUSUAL_API: (
+        "Review API access logs and usage patterns",
+        "Implement API rate limiting and throttling",
+        "Verify API key and authentication validity",
+        "Monitor for API abuse patterns"
+    )
+})
+_DEFAULT_ACTIONS = (
+    "Review the detected anomaly in detail",
+    "Investigate the affected resources",
+    "Implement appropriate security controls"
+)
+
+# Layout of Explanation.technical_details: the header, then one entry per
+# detected pattern
+_TECHNICAL_DETAILS_HEADER = """
+        Anomaly Type: {type}
+        Confidence Score: {confidence:.2f}
+        Severity Score: {severity:.2f}
+        Time Window: {start} to {end}
+        Affected Resources: {resources}
+        
+        Detected Patterns:
+        """
+_TECHNICAL_DETAILS_PATTERN = """
+        - {feature}: Expected {expected}, Got {actual:.2f} (Deviation: {deviation:.2f})
+        """
+
+
+def _technical_details(anomaly: AnomalyResult) -> str:
+    """Render an anomaly's technical details, joined once rather than grown per pattern"""
+    parts = [_TECHNICAL_DETAILS_HEADER.format(
+        type=anomaly.type.value,
+        confidence=anomaly.confidence,
+        severity=anomaly.severity,
+        start=anomaly.time_window.start,
+        end=anomaly.time_window.end,
+        resources=', '.join(anomaly.affected_resources),
+    )]
+    parts.extend(
+        _TECHNICAL_DETAILS_PATTERN.format(
+            feature=pattern.feature,
+            expected=pattern.expected_range,
+            actual=pattern.actual_value,
+            deviation=pattern.deviation,
+        )
+        for pattern in anomaly.patterns
+    )
+    return ''.join(parts).strip()
+
+
+def _keyword_pattern(keywords: List[str]) -> "re.Pattern[str]":
+    """Case-insensitive pattern matching text that contains any keyword"""
+    if not keywords:
+        return re.compile(r'(?!)')  # Like any() over no keywords: never matches
+    return re.compile('|'.join(map(re.escape, keywords)), re.IGNORECASE)
+
+
+def _feature_matrix(columns: Dict[str, np.ndarray]) -> np.ndarray:
+    """Model input for a set of feature columns: C-contiguous float32
+    
+    IsolationForest casts its input to float32 for tree traversal anyway;
+    handing it float32 up front avoids that copy and halves the matrix.
+    Hashed features are bucket numbers rather than one-hot columns, so
+    rows are dense and a sparse (CSC) layout would only add index arrays.
+    """
+    arrays = list(columns.values())
+    matrix = np.empty((len(arrays[0]), len(arrays)), dtype=np.float32)
+    for j, column in enumerate(arrays):
+        matrix[:, j] = column
+    return matrix
 
 
 class IsolationForestMLEngine(MLEngine):
     """ML Engine implementation using Isolation Forest for anomaly detection"""
     
-    def __init__(self, contamination: float = 0.05, random_state: int = 42):
+    def __init__(
+        self,
+        contamination: float = 0.05,
+        random_state: int = 42,
+        refit_every: Optional[int] = None,
+        n_jobs: Optional[int] = None,
+        use_gpu: bool = False
+    ):
         """
         Initialize the ML Engine with Isolation Forest
         
         Args:
             contamination: Expected proportion of anomalies in the data (lowered for better detection)
             random_state: Random state for reproducible results
+            refit_every: Keep the trained model across batches and retrain only after
+                this many logs have been scored (None trains on every batch unless
+                fit() was called)
+            n_jobs: Parallel jobs used to build the trees (None is one, -1 all cores)
+            use_gpu: Score on the GPU with cuML's Forest Inference Library when
+                cuML is installed (falls back to the CPU otherwise)
         """
         self.contamination = contamination
         self.random_state = random_state
+        self.refit_every = refit_every
+        self.n_jobs = n_jobs
+        self.use_gpu = use_gpu and CUML_AVAILABLE
         self.scaler = StandardScaler()
+        # max_samples stays 'auto', i.e. min(256, n_samples) per tree, so
+        # per-tree work does not grow with the batch size
         self.isolation_forest = IsolationForest(
             contamination=contamination,
             random_state=random_state,
-            n_estimators=100
+            n_estimators=100,
+            n_jobs=n_jobs
+        )
+        
+        # Whether scaler/isolation_forest hold a model later batches reuse
+        self._fitted = False
+        self._scored_since_fit = 0
+        
+        # The current model as loaded by scoring pool workers, dumped on first
+        # use after each fit, and how many pooled scorings hold each dump
+        self._scoring_model: Optional[_ScoringModel] = None
+        self._fil = None
+        self._fit_count = 0
+        self._model_dump: Optional[str] = None
+        self._model_dump_users: Counter = Counter()
+        self._dump_dir = tempfile.mkdtemp(
+            prefix='securon-model-', dir='/dev/shm' if os.path.isdir('/dev/shm') else None
         )
+        weakref.finalize(self, _remove_dump_dir, self._dump_dir)
         
         # Define suspicious patterns for rule-based detection
         self.suspicious_ports = {22, 23, 21, 3389, 1433, 3306, 5432, 27017, 161, 135, 139, 445}
@@ -42,6 +399,107 @@ class IsolationForestMLEngine(MLEngine):
         self.brute_force_keywords = ['login', 'auth', 'signin', 'failed', 'failure', 'error', 'denied']
         self.admin_keywords = ['admin', 'root', 'administrator', 'config', '.env', 'wp-admin']
         
+        # One compiled scan per keyword list instead of lower() plus a
+        # substring test per keyword
+        self._brute_force_pattern = _keyword_pattern(self.brute_force_keywords)
+        self._admin_pattern = _keyword_pattern(self.admin_keywords)
+        
+    def fit(self, logs: List[CloudLog]) -> None:
+        """Train the scaler and Isolation Forest on a baseline of logs
+        
+        Later batches are only scored against this model, not trained on.
+        """
+        if len(logs) < 3:
+            raise ValueError("At least 3 logs are required to fit the ML model")
+        
+        self._fit_features(_feature_matrix(self._extract_feature_columns(logs)))
+        self._fitted = True
+    
+    def _fit_features(self, matrix: np.ndarray) -> None:
+        """Fit the scaler and Isolation Forest on a feature matrix"""
+        self.isolation_forest.fit(self.scaler.fit_transform(matrix))
+        self._cache_path_lengths()
+        if self.use_gpu:
+            self._fil = cuml.ForestInference.load_from_sklearn(self.isolation_forest, output_class=False)
+        self._scored_since_fit = 0
+        self._fit_count += 1
+        
+        stale_dump, self._model_dump = self._model_dump, None
+        if stale_dump is not None and not self._model_dump_users[stale_dump]:
+            os.unlink(stale_dump)
+    
+    def _cache_path_lengths(self) -> None:
+        """Precompute, per tree node, the path length a sample ending there scores
+        
+        That is the node's depth plus the expected depth of the unbuilt
+        subtree below it. Scoring then only needs each tree's leaf index,
+        instead of rebuilding decision paths per batch.
+        """
+        forest = self.isolation_forest
+        path_lengths = []
+        for estimator in forest.estimators_:
+            tree = estimator.tree_
+            depths = np.zeros(tree.node_count)
+            # Nodes are numbered depth-first, so parents precede children
+            for node in np.flatnonzero(tree.children_left != -1):
+                depths[tree.children_left[node]] = depths[tree.children_right[node]] = depths[node] + 1
+            path_lengths.append(depths + _average_path_length(tree.n_node_samples))
+        
+        norm = len(forest.estimators_) * _average_path_length(np.array([forest.max_samples_]))[0]
+        self._scoring_model = (
+            list(forest.estimators_), list(forest.estimators_features_), path_lengths, norm, forest.offset_
+        )
+    
+    def _decision_function(self, matrix: np.ndarray) -> np.ndarray:
+        """IsolationForest.decision_function, scored from the cached path lengths"""
+        return _score_samples(self._scoring_model, matrix)
+    
+    def _gpu_decision_function(self, matrix: np.ndarray) -> np.ndarray:
+        """IsolationForest.decision_function, scored by cuML on the GPU"""
+        with cuml.using_output_type('numpy'):
+            # FIL returns the forest's anomaly score 2 ** (-depth / c),
+            # which is score_samples negated
+            scores = self._fil.predict(np.asarray(matrix, dtype=np.float32))
+        return -np.asarray(scores, dtype=np.float64).ravel() - self.isolation_forest.offset_
+    
+    async def _score(self, matrix: np.ndarray) -> np.ndarray:
+        """Score a normalized feature matrix, off the event loop when it is large
+        
+        With use_gpu the whole batch is scored on the GPU. Otherwise large
+        batches go to the shared scoring pool, whose workers load the current
+        model once from a memory-mapped dump instead of receiving it with
+        every batch.
+        """
+        if self._fil is not None:
+            return self._gpu_decision_function(matrix)
+        
+        if len(matrix) < _POOL_MIN_ROWS:
+            return self._decision_function(matrix)
+        
+        if self._model_dump is None:
+            self._model_dump = os.path.join(self._dump_dir, f'model-{self._fit_count}.joblib')
+            joblib.dump(self._scoring_model, self._model_dump)
+        model_dump = self._model_dump
+        
+        self._model_dump_users[model_dump] += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(
+                get_process_pool(), _score_in_worker, model_dump, matrix
+            )
+        finally:
+            self._model_dump_users[model_dump] -= 1
+            if not self._model_dump_users[model_dump]:
+                del self._model_dump_users[model_dump]
+                # Replaced by a refit while this batch was being scored
+                if model_dump != self._model_dump:
+                    os.unlink(model_dump)
+    
+    def _needs_fit(self) -> bool:
+        """Whether the next batch must train the model before it is scored"""
+        if not self._fitted:
+            return True
+        return self.refit_every is not None and self._scored_since_fit >= self.refit_every
+    
     async def process_logs(self, logs: List[CloudLog]) -> List[AnomalyResult]:
         """Process cloud logs and detect anomalies using hybrid approach"""
         if not logs:
@@ -82,8 +540,7 @@ class IsolationForestMLEngine(MLEngine):
                 anomalies.append(anomaly)
             
             # Brute force detection
-            if normalized.action and any(keyword in normalized.action.lower() 
-                                       for keyword in self.brute_force_keywords):
+            if normalized.action and self._brute_force_pattern.search(normalized.action):
                 # Track failed logins by IP
                 ip = normalized.source_ip or 'unknown'
                 if ip not in failed_logins:
@@ -98,10 +555,8 @@ class IsolationForestMLEngine(MLEngine):
                     anomalies.append(anomaly)
             
             # Admin/config access detection
-            if (normalized.resource and any(keyword in normalized.resource.lower() 
-                                          for keyword in self.admin_keywords)) or \
-               (normalized.api_call and any(keyword in normalized.api_call.lower() 
-                                          for keyword in self.admin_keywords)):
+            if (normalized.resource and self._admin_pattern.search(normalized.resource)) or \
+               (normalized.api_call and self._admin_pattern.search(normalized.api_call)):
                 anomaly = self._create_anomaly_result(
                     log, None, -0.7, i, AnomalyType.UNUSUAL_API
                 )
@@ -125,30 +580,42 @@ class IsolationForestMLEngine(MLEngine):
     
     async def _detect_ml_anomalies(self, logs: List[CloudLog]) -> List[AnomalyResult]:
         """Use ML-based detection for pattern anomalies"""
-        # Convert logs to feature matrix
-        features_df = self._extract_features(logs)
-        
-        if features_df.empty or len(features_df) < 3:
+        if len(logs) < 3:
             return []
-            
-        # Normalize features
-        features_normalized = self.scaler.fit_transform(features_df)
         
-        # Detect anomalies
-        anomaly_scores = self.isolation_forest.fit_predict(features_normalized)
-        anomaly_scores_continuous = self.isolation_forest.decision_function(features_normalized)
+        # Convert logs to feature matrix; scikit-learn gets the columns as a
+        # plain ndarray, with no DataFrame in between
+        columns = self._extract_feature_columns(logs)
+        matrix = _feature_matrix(columns)
         
-        # Generate anomaly results
-        anomalies = []
-        for i, (score, continuous_score) in enumerate(zip(anomaly_scores, anomaly_scores_continuous)):
-            if score == -1:  # Anomaly detected
-                log = logs[i]
-                anomaly = self._create_anomaly_result(
-                    log, features_df.iloc[i], continuous_score, i
-                )
-                anomalies.append(anomaly)
-                
-        return anomalies
+        if self._needs_fit():
+            self._fit_features(matrix)
+            # Without refit_every each batch is scored against a model
+            # trained on itself, unless fit() supplied a baseline
+            self._fitted = self.refit_every is not None
+        
+        # Normalize features
+        features_normalized = self.scaler.transform(matrix)
+        
+        # Detect anomalies; predict() is decision_function() < 0, so score once
+        anomaly_scores_continuous = await self._score(features_normalized)
+        self._scored_since_fit += len(logs)
+        
+        # Generate anomaly results for the flagged rows only, pulling their
+        # features out of each column in one gather
+        anomaly_indices = np.flatnonzero(anomaly_scores_continuous < 0).tolist()
+        flagged_columns = {name: column[anomaly_indices].tolist() for name, column in columns.items()}
+        flagged_features = [
+            dict(zip(flagged_columns, values)) for values in zip(*flagged_columns.values())
+        ]
+        flagged_types = self._classify_anomaly_types([logs[i] for i in anomaly_indices])
+        
+        return [
+            self._create_anomaly_result(
+                logs[i], features, anomaly_scores_continuous[i], i, anomaly_type
+            )
+            for i, features, anomaly_type in zip(anomaly_indices, flagged_features, flagged_types)
+        ]
     
     def _deduplicate_anomalies(self, anomalies: List[AnomalyResult]) -> List[AnomalyResult]:
         """Remove duplicate anomalies based on similarity"""
@@ -167,36 +634,61 @@ class IsolationForestMLEngine(MLEngine):
     
     def _extract_features(self, logs: List[CloudLog]) -> pd.DataFrame:
         """Extract numerical features from cloud logs for ML analysis"""
-        features = []
+        if not logs:
+            return pd.DataFrame()
+        
+        # Columns are freshly built; adopt them without copying
+        return pd.DataFrame(self._extract_feature_columns(logs), copy=False)
+    
+    def _extract_feature_columns(self, logs: List[CloudLog]) -> Dict[str, np.ndarray]:
+        """Extract the numerical feature columns of a non-empty batch of logs"""
+        # Walk the logs once into plain columns; hashing and date parts are
+        # then computed per column rather than per row. This attribute walk
+        # over the pydantic models is most of the cost; the hashing already
+        # runs in C, so a compiled (e.g. Numba) hash kernel would not help.
+        timestamps = []
+        source_ips = []
+        destination_ips = []
+        ports = []
+        protocols = []
+        actions = []
+        users = []
+        resources = []
+        api_calls = []
         
         for log in logs:
             normalized = log.normalized_data
-            feature_dict = {
-                'hour_of_day': log.timestamp.hour,
-                'day_of_week': log.timestamp.weekday(),
-                'source_ip_hash': hash(normalized.source_ip) % 10000,
-                'port': normalized.port or 0,
-                'protocol_hash': hash(normalized.protocol or '') % 100,
-                'action_hash': hash(normalized.action) % 100,
-                'user_hash': hash(normalized.user or '') % 1000,
-                'resource_hash': hash(normalized.resource or '') % 1000,
-                'api_call_hash': hash(normalized.api_call or '') % 1000,
-            }
-            
-            # Add destination IP if available
-            if normalized.destination_ip:
-                feature_dict['dest_ip_hash'] = hash(normalized.destination_ip) % 10000
-            else:
-                feature_dict['dest_ip_hash'] = 0
-                
-            features.append(feature_dict)
-            
-        return pd.DataFrame(features)
+            timestamps.append(log.timestamp)
+            source_ips.append(normalized.source_ip)
+            destination_ips.append(normalized.destination_ip or '')
+            ports.append(normalized.port or 0)
+            protocols.append(normalized.protocol or '')
+            actions.append(normalized.action)
+            users.append(normalized.user or '')
+            resources.append(normalized.resource or '')
+            api_calls.append(normalized.api_call or '')
+        
+        times = pd.DatetimeIndex(timestamps)
+        dest_ip_hash = _hash_column(destination_ips, 10000)
+        dest_ip_hash[np.asarray(destination_ips, dtype=object) == ''] = 0
+        
+        return {
+            'hour_of_day': times.hour.to_numpy(),
+            'day_of_week': times.weekday.to_numpy(),
+            'source_ip_hash': _hash_column(source_ips, 10000),
+            'port': np.asarray(ports, dtype=np.int64),
+            'protocol_hash': _hash_column(protocols, 100),
+            'action_hash': _hash_column(actions, 100),
+            'user_hash': _hash_column(users, 1000),
+            'resource_hash': _hash_column(resources, 1000),
+            'api_call_hash': _hash_column(api_calls, 1000),
+            'dest_ip_hash': dest_ip_hash,
+        }
     
     def _create_anomaly_result(
         self, 
         log: CloudLog, 
-        features: pd.Series, 
+        features: Optional[Dict[str, Any]], 
         anomaly_score: float,
         log_index: int,
         anomaly_type: AnomalyType = None
@@ -230,7 +722,7 @@ class IsolationForestMLEngine(MLEngine):
             affected_resources.append(f"IP:{log.normalized_data.destination_ip}")
             
         return AnomalyResult(
-            id=str(uuid.uuid4()),
+            id=_new_anomaly_id(),
             type=anomaly_type,
             severity=severity,
             confidence=confidence,
@@ -244,8 +736,7 @@ class IsolationForestMLEngine(MLEngine):
         normalized = log.normalized_data
         
         # Brute force detection: authentication-related actions (check first as it's most critical)
-        if normalized.action and any(keyword in normalized.action.lower() 
-                                   for keyword in self.brute_force_keywords):
+        if normalized.action and self._brute_force_pattern.search(normalized.action):
             return AnomalyType.BRUTE_FORCE
         
         # Port scan detection: suspicious ports or multiple port access
@@ -253,10 +744,8 @@ class IsolationForestMLEngine(MLEngine):
             return AnomalyType.PORT_SCAN
             
         # Unusual API behavior: admin/config access attempts
-        if ((normalized.resource and any(keyword in normalized.resource.lower()
-                                       for keyword in self.admin_keywords)) or
-            (normalized.api_call and any(keyword in normalized.api_call.lower()
-                                       for keyword in self.admin_keywords))):
+        if ((normalized.resource and self._admin_pattern.search(normalized.resource)) or
+            (normalized.api_call and self._admin_pattern.search(normalized.api_call))):
             return AnomalyType.UNUSUAL_API
         
         # Check for suspicious source IPs or unusual access patterns
@@ -267,38 +756,48 @@ class IsolationForestMLEngine(MLEngine):
         # Default to suspicious IP for other cases
         return AnomalyType.SUSPICIOUS_IP
     
-    def _generate_anomaly_patterns(self, features: pd.Series, log: CloudLog) -> List[AnomalyPattern]:
+    def _classify_anomaly_types(self, logs: List[CloudLog]) -> List[AnomalyType]:
+        """Classify a batch of logs at once, as _classify_anomaly_type would
+        
+        Each rule becomes a boolean column; weighting the columns by rule
+        priority and taking the maximum picks the first matching rule per row
+        without branching.
+        """
+        if not logs:
+            return []
+        
+        entries = [log.normalized_data for log in logs]
+        actions = pd.Series([entry.action for entry in entries], dtype=object)
+        resources = pd.Series([entry.resource for entry in entries], dtype=object)
+        api_calls = pd.Series([entry.api_call for entry in entries], dtype=object)
+        ports = np.array([entry.port or 0 for entry in entries])
+        
+        brute_force = actions.str.contains(self._brute_force_pattern, na=False).to_numpy(dtype=bool)
+        port_scan = (ports != 0) & np.isin(ports, list(self.suspicious_ports))
+        unusual_api = (
+            resources.str.contains(self._admin_pattern, na=False).to_numpy(dtype=bool)
+            | api_calls.str.contains(self._admin_pattern, na=False).to_numpy(dtype=bool)
+        )
+        
+        codes = np.maximum(np.maximum(brute_force * 3, port_scan * 2), unusual_api * 1)
+        return _ANOMALY_TYPE_BY_CODE[codes].tolist()
+    
+    def _generate_anomaly_patterns(self, features: Dict[str, Any], log: CloudLog) -> List[AnomalyPattern]:
         """Generate patterns that contributed to the anomaly detection"""
         patterns = []
         
         # Hour of day pattern
         if features['hour_of_day'] < 6 or features['hour_of_day'] > 22:
-            patterns.append(AnomalyPattern(
-                feature="hour_of_day",
-                expected_range=(6.0, 22.0),
-                actual_value=float(features['hour_of_day']),
-                deviation=abs(features['hour_of_day'] - 14.0) / 14.0
-            ))
+            patterns.append(_hour_of_day_pattern(features['hour_of_day']))
             
         # Port pattern
         if features['port'] > 0:
             if features['port'] < 1024 or features['port'] > 65000:
-                patterns.append(AnomalyPattern(
-                    feature="port",
-                    expected_range=(1024.0, 65000.0),
-                    actual_value=float(features['port']),
-                    deviation=1.0 if features['port'] < 1024 else 
-                             (features['port'] - 65000) / 65000
-                ))
+                patterns.append(_port_pattern(features['port']))
                 
         # Add at least one pattern if none were generated
         if not patterns:
-            patterns.append(AnomalyPattern(
-                feature="general_behavior",
-                expected_range=(0.0, 1.0),
-                actual_value=0.0,
-                deviation=1.0
-            ))
+            patterns.append(_GENERAL_BEHAVIOR_PATTERN)
             
         return patterns
     
@@ -309,111 +808,52 @@ class IsolationForestMLEngine(MLEngine):
         
         # Port-based patterns
         if normalized.port and normalized.port in self.suspicious_ports:
-            patterns.append(AnomalyPattern(
-                feature="suspicious_port",
-                expected_range=(1024.0, 65535.0),
-                actual_value=float(normalized.port),
-                deviation=1.0
-            ))
+            patterns.append(_suspicious_port_pattern(normalized.port))
         
         # Action-based patterns
-        if normalized.action and any(keyword in normalized.action.lower() 
-                                   for keyword in self.brute_force_keywords):
-            patterns.append(AnomalyPattern(
-                feature="authentication_failure",
-                expected_range=(0.0, 0.1),
-                actual_value=1.0,
-                deviation=1.0
-            ))
+        if normalized.action and self._brute_force_pattern.search(normalized.action):
+            patterns.append(_AUTHENTICATION_FAILURE_PATTERN)
         
         # Resource-based patterns
-        if normalized.resource and any(keyword in normalized.resource.lower() 
-                                     for keyword in self.admin_keywords):
-            patterns.append(AnomalyPattern(
-                feature="admin_access_attempt",
-                expected_range=(0.0, 0.1),
-                actual_value=1.0,
-                deviation=1.0
-            ))
+        if normalized.resource and self._admin_pattern.search(normalized.resource):
+            patterns.append(_ADMIN_ACCESS_PATTERN)
         
         # Default pattern if none found
         if not patterns:
-            patterns.append(AnomalyPattern(
-                feature="general_suspicious_behavior",
-                expected_range=(0.0, 0.5),
-                actual_value=1.0,
-                deviation=1.0
-            ))
+            patterns.append(_GENERAL_SUSPICIOUS_PATTERN)
         
         return patterns
     
     def generate_candidate_rules(self, anomalies: List[AnomalyResult]) -> List[SecurityRule]:
         """Generate candidate security rules from detected anomalies"""
-        rules = []
+        if not anomalies:
+            return []
+        
+        # Group anomalies by type to create comprehensive rules; factorize
+        # keeps the types in order of first appearance, and the per-type
+        # average severity is a single weighted bincount
+        codes, anomaly_types = pd.factorize(np.array([anomaly.type for anomaly in anomalies], dtype=object))
+        severities = np.fromiter((anomaly.severity for anomaly in anomalies), dtype=np.float64, count=len(anomalies))
+        avg_severities = np.bincount(codes, weights=severities) / np.bincount(codes)
         
-        # Group anomalies by type to create comprehensive rules
-        anomaly_groups = {}
-        for anomaly in anomalies:
-            if anomaly.type not in anomaly_groups:
-                anomaly_groups[anomaly.type] = []
-            anomaly_groups[anomaly.type].append(anomaly)
-            
         # Generate rules for each anomaly type
-        for anomaly_type, type_anomalies in anomaly_groups.items():
-            rule = self._create_rule_for_anomaly_type(anomaly_type, type_anomalies)
-            rules.append(rule)
-            
-        return rules
+        return [
+            self._create_rule_for_anomaly_type(anomaly_type, avg_severity)
+            for anomaly_type, avg_severity in zip(anomaly_types, avg_severities.tolist())
+        ]
     
     def _create_rule_for_anomaly_type(
         self, 
         anomaly_type: AnomalyType, 
-        anomalies: List[AnomalyResult]
+        avg_severity: float
     ) -> SecurityRule:
-        """Create a security rule for a specific anomaly type"""
-        
-        # Calculate average severity
-        avg_severity = sum(a.severity for a in anomalies) / len(anomalies)
+        """Create a security rule for a specific anomaly type from its average severity"""
         
         # Map severity to enum
-        if avg_severity > 0.8:
-            severity = Severity.CRITICAL
-        elif avg_severity > 0.6:
-            severity = Severity.HIGH
-        elif avg_severity > 0.4:
-            severity = Severity.MEDIUM
-        else:
-            severity = Severity.LOW
-            
-        # Generate rule based on anomaly type
-        rule_configs = {
-            AnomalyType.PORT_SCAN: {
-                'name': 'ML-Generated Port Scan Detection',
-                'description': 'Detect potential port scanning activities based on ML analysis',
-                'pattern': 'port_access_pattern_unusual',
-                'remediation': 'Review network access patterns and implement port access controls'
-            },
-            AnomalyType.BRUTE_FORCE: {
-                'name': 'ML-Generated Brute Force Detection',
-                'description': 'Detect potential brute force attacks based on ML analysis',
-                'pattern': 'authentication_failure_pattern',
-                'remediation': 'Implement account lockout policies and multi-factor authentication'
-            },
-            AnomalyType.SUSPICIOUS_IP: {
-                'name': 'ML-Generated Suspicious IP Detection',
-                'description': 'Detect suspicious IP activity based on ML analysis',
-                'pattern': 'ip_behavior_anomaly',
-                'remediation': 'Review IP access patterns and implement IP allowlisting'
-            },
-            AnomalyType.UNUSUAL_API: {
-                'name': 'ML-Generated Unusual API Detection',
-                'description': 'Detect unusual API behavior based on ML analysis',
-                'pattern': 'api_usage_anomaly',
-                'remediation': 'Review API access patterns and implement API rate limiting'
-            }
-        }
+        severity = _severity_level(avg_severity)
         
-        config = rule_configs[anomaly_type]
+        # Generate rule based on anomaly type
+        config = _RULE_CONFIGS[anomaly_type]
         
         return SecurityRule(
             id=str(uuid.uuid4()),
@@ -431,78 +871,18 @@ class IsolationForestMLEngine(MLEngine):
         """Provide detailed explanation for a detected anomaly"""
         
         # Generate summary based on anomaly type
-        summaries = {
-            AnomalyType.PORT_SCAN: "Potential port scanning activity detected",
-            AnomalyType.BRUTE_FORCE: "Potential brute force attack detected", 
-            AnomalyType.SUSPICIOUS_IP: "Suspicious IP activity detected",
-            AnomalyType.UNUSUAL_API: "Unusual API behavior detected"
-        }
-        
-        summary = summaries.get(anomaly.type, "Anomalous behavior detected")
-        
-        # Generate technical details
-        technical_details = f"""
-        Anomaly Type: {anomaly.type.value}
-        Confidence Score: {anomaly.confidence:.2f}
-        Severity Score: {anomaly.severity:.2f}
-        Time Window: {anomaly.time_window.start} to {anomaly.time_window.end}
-        Affected Resources: {', '.join(anomaly.affected_resources)}
-        
-        Detected Patterns:
-        """
-        
-        for pattern in anomaly.patterns:
-            technical_details += f"""
-        - {pattern.feature}: Expected {pattern.expected_range}, Got {pattern.actual_value:.2f} (Deviation: {pattern.deviation:.2f})
-        """
+        summary = _SUMMARIES.get(anomaly.type, "Anomalous behavior detected")
         
         # Map severity score to risk level
-        if anomaly.severity > 0.8:
-            risk_level = Severity.CRITICAL
-        elif anomaly.severity > 0.6:
-            risk_level = Severity.HIGH
-        elif anomaly.severity > 0.4:
-            risk_level = Severity.MEDIUM
-        else:
-            risk_level = Severity.LOW
-            
-        # Generate recommended actions based on anomaly type
-        action_map = {
-            AnomalyType.PORT_SCAN: [
-                "Review network access logs for the affected time period",
-                "Implement network segmentation to limit port access",
-                "Configure intrusion detection systems",
-                "Review firewall rules and access controls"
-            ],
-            AnomalyType.BRUTE_FORCE: [
-                "Review authentication logs for failed login attempts",
-                "Implement account lockout policies",
-                "Enable multi-factor authentication",
-                "Monitor for credential stuffing attacks"
-            ],
-            AnomalyType.SUSPICIOUS_IP: [
-                "Investigate the source IP address",
-                "Review geolocation and reputation of the IP",
-                "Implement IP-based access controls",
-                "Monitor for additional suspicious activity"
-            ],
-            AnomalyType.UNUSUAL_API: [
-                "Review API access logs and usage patterns",
-                "Implement API rate limiting and throttling",
-                "Verify API key and authentication validity",
-                "Monitor for API abuse patterns"
-            ]
-        }
+        risk_level = _severity_level(anomaly.severity)
         
-        recommended_actions = action_map.get(anomaly.type, [
-            "Review the detected anomaly in detail",
-            "Investigate the affected resources",
-            "Implement appropriate security controls"
-        ])
+        # Generate recommended actions based on anomaly type
+        recommended_actions = _ACTION_MAP.get(anomaly.type, _DEFAULT_ACTIONS)
         
         return Explanation(
             summary=summary,
-            technical_details=technical_details.strip(),
+            # Rendered only if a caller reads or serializes the details
+            technical_details=partial(_technical_details, anomaly),
             risk_level=risk_level,
             recommended_actions=recommended_actions
         )
\ No newline at end of file
@@ -1,12 +1,17 @@
 """ML Engine factory for creating ML Engine instances"""
 
+from typing import Optional
+
 from .engine import IsolationForestMLEngine
 from ..interfaces.ml_engine import MLEngine
 
 
 def create_ml_engine(
     contamination: float = 0.1,
-    random_state: int = 42
+    random_state: int = 42,
+    refit_every: Optional[int] = None,
+    n_jobs: Optional[int] = None,
+    use_gpu: bool = False
 ) -> MLEngine:
     """
     Create an ML Engine instance with Isolation Forest
@@ -14,11 +19,18 @@ def create_ml_engine(
     Args:
         contamination: Expected proportion of anomalies in the data (default: 0.1)
         random_state: Random state for reproducible results (default: 42)
+        refit_every: Logs to score before retraining a kept model (default: None,
+            train on every batch)
+        n_jobs: Parallel jobs used to build the trees (default: None, one job)
+        use_gpu: Score on the GPU when cuML is installed (default: False)
         
     Returns:
         MLEngine instance configured with Isolation Forest
     """
     return IsolationForestMLEngine(
         contamination=contamination,
-        random_state=random_state
+        random_state=random_state,
+        refit_every=refit_every,
+        n_jobs=n_jobs,
+        use_gpu=use_gpu
     )
\ No newline at end of file
@@ -1,22 +1,25 @@
 """Backup and recovery service for Securon platform"""
 
 import asyncio
+import errno
+import heapq
 import logging
+import os
 import shutil
+import sys
 import json
-from datetime import datetime, timedelta
+from collections import defaultdict
+from datetime import datetime, time, timedelta
 from pathlib import Path
-from typing import Dict, List, Optional, Any
-from dataclasses import dataclass
+from concurrent.futures import Future
+from typing import Dict, List, Optional, Any, Tuple, Union
+from dataclasses import dataclass, replace
 try:
-    import schedule
-    SCHEDULE_AVAILABLE = True
+    import orjson
+    ORJSON_AVAILABLE = True
 except ImportError:
-    SCHEDULE_AVAILABLE = False
-    schedule = None
-
-import time
-from threading import Thread
+    ORJSON_AVAILABLE = False
+    orjson = None
 
 from .data_access import SecuronDataAccess, DataAccessError
 from .config import PlatformConfig
@@ -24,22 +27,70 @@ from .config import PlatformConfig
 
 logger = logging.getLogger(__name__)
 
+# dataclass(slots=True) needs Python 3.10; older interpreters keep __dict__
+_DATACLASS_SLOTS = {'slots': True} if sys.version_info >= (3, 10) else {}
+
+# Local time of day at which old backups are cleaned up
+_CLEANUP_TIME = time(2, 0)
+
+
+def _next_daily_run(now: datetime, at: time) -> datetime:
+    """Return the first datetime after now that falls on the given time of day"""
+    run = datetime.combine(now.date(), at)
+    return run if run > now else run + timedelta(days=1)
+
+
+def _move_file(source: Path, destination: Path) -> None:
+    """Move a file, as a single rename when both paths share a filesystem"""
+    try:
+        os.replace(source, destination)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+        # Across filesystems: copyfile copies in the kernel (sendfile) where
+        # the platform allows it, then the source is dropped
+        shutil.copyfile(source, destination)
+        os.unlink(source)
+
+
+def _write_json(path: Path, data: Any) -> None:
+    """Write data to path as indented JSON, encoded in full and written once"""
+    if ORJSON_AVAILABLE:
+        payload = orjson.dumps(data, default=str, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+        path.write_bytes(payload)
+    else:
+        path.write_text(json.dumps(data, indent=2, default=str))
+
 
-@dataclass
+@dataclass(frozen=True, **_DATACLASS_SLOTS)
 class BackupInfo:
-    """Information about a backup"""
+    """Information about a backup
+    
+    Frozen because list_backups hands out the instances it caches per
+    backup directory.
+    """
     name: str
     path: str
     size_bytes: int
-    created_at: datetime
+    created_ts: float  # Unix timestamp (file mtime)
     backup_type: str  # 'manual', 'scheduled', 'emergency'
     description: Optional[str] = None
+    
+    @property
+    def created_at(self) -> datetime:
+        """Creation time as a local datetime, for display"""
+        return datetime.fromtimestamp(self.created_ts)
 
 
 class BackupService:
     """Comprehensive backup and recovery service"""
     
-    def __init__(self, data_access: SecuronDataAccess, config: Optional[PlatformConfig] = None):
+    def __init__(
+        self,
+        data_access: SecuronDataAccess,
+        config: Optional[PlatformConfig] = None,
+        loop: Optional[asyncio.AbstractEventLoop] = None
+    ):
         self.data_access = data_access
         self.config = config or PlatformConfig()
         
@@ -55,73 +106,92 @@ class BackupService:
         self.config_backup_dir = self.backup_root / 'config'
         self.logs_backup_dir = self.backup_root / 'logs'
         
-        # Create directories
-        for directory in [self.db_backup_dir, self.config_backup_dir, self.logs_backup_dir]:
-            directory.mkdir(parents=True, exist_ok=True)
+        # Create directories; a single stat when they already exist
+        for directory in (self.db_backup_dir, self.config_backup_dir, self.logs_backup_dir):
+            if not os.path.isdir(directory):
+                directory.mkdir(parents=True, exist_ok=True)
+        
+        # Per backup directory: its mtime when last scanned and the backups found
+        self._backup_index_cache: Dict[Path, Tuple[int, List[BackupInfo]]] = {}
         
         # Scheduler for automatic backups
-        self._scheduler_thread = None
-        self._scheduler_running = False
+        self._scheduler_task: Optional[Union[asyncio.Task, Future]] = None
         
         if self.backup_enabled:
-            self._setup_scheduler()
+            self._setup_scheduler(loop)
         
         logger.info(f"BackupService initialized with {self.backup_interval_hours}h interval")
     
-    def _setup_scheduler(self):
+    def _setup_scheduler(self, loop: Optional[asyncio.AbstractEventLoop] = None):
         """Setup automatic backup scheduler"""
-        if not self.backup_enabled or not SCHEDULE_AVAILABLE:
-            if not SCHEDULE_AVAILABLE:
-                logger.warning("Schedule module not available, automatic backups disabled")
-            return
-        
-        # Schedule regular backups
-        schedule.every(self.backup_interval_hours).hours.do(self._scheduled_backup)
+        if loop is None:
+            try:
+                asyncio.get_running_loop()
+            except RuntimeError:
+                logger.warning("No running event loop, call start_scheduler() from the loop to enable automatic backups")
+                return
         
-        # Schedule cleanup
-        schedule.every().day.at("02:00").do(self._scheduled_cleanup)
+        self.start_scheduler(loop)
+    
+    def start_scheduler(self, loop: Optional[asyncio.AbstractEventLoop] = None):
+        """Start the backup scheduler as a task on an event loop
         
-        # Start scheduler thread
-        self._scheduler_running = True
-        self._scheduler_thread = Thread(target=self._run_scheduler, daemon=True)
-        self._scheduler_thread.start()
+        Without a loop the task goes on the running one; a loop running in
+        another thread (e.g. the API server's) can be passed instead, and the
+        task is handed to it thread-safely.
+        """
+        if self._scheduler_task and not self._scheduler_task.done():
+            return
         
+        if loop is None:
+            self._scheduler_task = asyncio.get_running_loop().create_task(self._scheduler_loop())
+        else:
+            self._scheduler_task = asyncio.run_coroutine_threadsafe(self._scheduler_loop(), loop)
         logger.info("Backup scheduler started")
     
-    def _run_scheduler(self):
-        """Run the backup scheduler"""
-        if not SCHEDULE_AVAILABLE:
-            return
-            
-        while self._scheduler_running:
-            try:
-                schedule.run_pending()
-                time.sleep(60)  # Check every minute
-            except Exception as e:
-                logger.error(f"Scheduler error: {str(e)}")
-                time.sleep(300)  # Wait 5 minutes on error
+    async def _scheduler_loop(self):
+        """Sleep until the next backup or cleanup is due, run it, and repeat"""
+        interval = timedelta(hours=self.backup_interval_hours)
+        next_backup = datetime.now() + interval
+        next_cleanup = _next_daily_run(datetime.now(), _CLEANUP_TIME)
+        
+        while True:
+            delay = (min(next_backup, next_cleanup) - datetime.now()).total_seconds()
+            await asyncio.sleep(max(0.0, delay))
+            
+            now = datetime.now()
+            if now >= next_backup:
+                await self._scheduled_backup()
+                next_backup = datetime.now() + interval
+            if now >= next_cleanup:
+                await self._scheduled_cleanup()
+                next_cleanup = _next_daily_run(datetime.now(), _CLEANUP_TIME)
     
-    def _scheduled_backup(self):
+    async def _scheduled_backup(self):
         """Perform scheduled backup"""
+        now = datetime.now()
         try:
-            asyncio.run(self.create_full_backup(
+            await self.create_full_backup(
                 backup_type='scheduled',
-                description=f"Scheduled backup at {datetime.now().isoformat()}"
-            ))
+                description=f"Scheduled backup at {now.isoformat()}",
+                now=now
+            )
         except Exception as e:
             logger.error(f"Scheduled backup failed: {str(e)}")
     
-    def _scheduled_cleanup(self):
+    async def _scheduled_cleanup(self):
         """Perform scheduled cleanup"""
         try:
-            asyncio.run(self.cleanup_old_backups())
+            await self.cleanup_old_backups()
         except Exception as e:
             logger.error(f"Scheduled cleanup failed: {str(e)}")
     
-    async def create_database_backup(self, backup_name: Optional[str] = None) -> BackupInfo:
+    async def create_database_backup(self, backup_name: Optional[str] = None,
+                                     now: Optional[datetime] = None) -> BackupInfo:
         """Create database backup"""
         if not backup_name:
-            backup_name = f"db_backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.db"
+            now = now or datetime.now()
+            backup_name = f"db_backup_{now.strftime('%Y%m%d_%H%M%S')}.db"
         
         try:
             backup_path = await self.data_access.create_backup(backup_name)
@@ -129,13 +199,15 @@ class BackupService:
             
             # Move to organized backup directory
             organized_path = self.db_backup_dir / backup_file.name
-            shutil.move(backup_path, organized_path)
+            _move_file(backup_file, organized_path)
+            self._backup_index_cache.pop(self.db_backup_dir, None)
             
+            stat = organized_path.stat()
             backup_info = BackupInfo(
                 name=backup_file.name,
                 path=str(organized_path),
-                size_bytes=organized_path.stat().st_size,
-                created_at=datetime.now(),
+                size_bytes=stat.st_size,
+                created_ts=stat.st_mtime,
                 backup_type='database'
             )
             
@@ -146,9 +218,13 @@ class BackupService:
             logger.error(f"Database backup failed: {str(e)}")
             raise
     
-    async def create_config_backup(self) -> BackupInfo:
-        """Create configuration backup"""
-        backup_name = f"config_backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    async def create_config_backup(self, now: Optional[datetime] = None) -> BackupInfo:
+        """Create configuration backup
+        
+        now, when given, is the time the backup is named and stamped with.
+        """
+        now = now or datetime.now()
+        backup_name = f"config_backup_{now.strftime('%Y%m%d_%H%M%S')}.json"
         backup_path = self.config_backup_dir / backup_name
         
         try:
@@ -157,21 +233,22 @@ class BackupService:
                 'platform_config': self.config.to_dict() if hasattr(self.config, 'to_dict') else {},
                 'system_health': await self.data_access.get_system_health(),
                 'backup_info': {
-                    'created_at': datetime.now().isoformat(),
+                    'created_at': now.isoformat(),
                     'backup_type': 'configuration',
                     'version': '1.0'
                 }
             }
             
             # Save configuration
-            with open(backup_path, 'w') as f:
-                json.dump(config_data, f, indent=2, default=str)
+            _write_json(backup_path, config_data)
+            self._backup_index_cache.pop(self.config_backup_dir, None)
             
+            stat = backup_path.stat()
             backup_info = BackupInfo(
                 name=backup_name,
                 path=str(backup_path),
-                size_bytes=backup_path.stat().st_size,
-                created_at=datetime.now(),
+                size_bytes=stat.st_size,
+                created_ts=stat.st_mtime,
                 backup_type='configuration'
             )
             
@@ -184,29 +261,32 @@ class BackupService:
     
     async def create_full_backup(self, 
                                backup_type: str = 'manual',
-                               description: Optional[str] = None) -> Dict[str, BackupInfo]:
-        """Create comprehensive backup of all system data"""
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+                               description: Optional[str] = None,
+                               now: Optional[datetime] = None) -> Dict[str, BackupInfo]:
+        """Create comprehensive backup of all system data
+        
+        All components and the manifest share one timestamp, now if given.
+        """
+        now = now or datetime.now()
+        timestamp = now.strftime('%Y%m%d_%H%M%S')
         
         try:
             backups = {}
             
             # Database backup
             db_backup = await self.create_database_backup(f"full_db_{timestamp}.db")
-            db_backup.backup_type = backup_type
-            db_backup.description = description
+            db_backup = replace(db_backup, backup_type=backup_type, description=description)
             backups['database'] = db_backup
             
             # Configuration backup
-            config_backup = await self.create_config_backup()
-            config_backup.backup_type = backup_type
-            config_backup.description = description
+            config_backup = await self.create_config_backup(now=now)
+            config_backup = replace(config_backup, backup_type=backup_type, description=description)
             backups['configuration'] = config_backup
             
             # Create backup manifest
             manifest = {
                 'backup_id': f"full_{timestamp}",
-                'created_at': datetime.now().isoformat(),
+                'created_at': now.isoformat(),
                 'backup_type': backup_type,
                 'description': description,
                 'components': {
@@ -225,8 +305,7 @@ class BackupService:
             }
             
             manifest_path = self.backup_root / f"manifest_{timestamp}.json"
-            with open(manifest_path, 'w') as f:
-                json.dump(manifest, f, indent=2)
+            _write_json(manifest_path, manifest)
             
             logger.info(f"Full backup completed: {len(backups)} components, {manifest['total_size_bytes']} bytes")
             return backups
@@ -274,40 +353,17 @@ class BackupService:
             raise
     
     async def list_backups(self, backup_type: Optional[str] = None) -> List[BackupInfo]:
-        """List available backups"""
+        """List available backups, in no particular order"""
         backups = []
         
         try:
             # Database backups
-            for backup_file in self.db_backup_dir.glob("*.db"):
-                if backup_type and backup_type != 'database':
-                    continue
-                
-                backup_info = BackupInfo(
-                    name=backup_file.name,
-                    path=str(backup_file),
-                    size_bytes=backup_file.stat().st_size,
-                    created_at=datetime.fromtimestamp(backup_file.stat().st_mtime),
-                    backup_type='database'
-                )
-                backups.append(backup_info)
+            if not backup_type or backup_type == 'database':
+                backups.extend(self._scan_backup_dir(self.db_backup_dir, '.db', 'database'))
             
             # Configuration backups
-            for backup_file in self.config_backup_dir.glob("*.json"):
-                if backup_type and backup_type != 'configuration':
-                    continue
-                
-                backup_info = BackupInfo(
-                    name=backup_file.name,
-                    path=str(backup_file),
-                    size_bytes=backup_file.stat().st_size,
-                    created_at=datetime.fromtimestamp(backup_file.stat().st_mtime),
-                    backup_type='configuration'
-                )
-                backups.append(backup_info)
-            
-            # Sort by creation time (newest first)
-            backups.sort(key=lambda x: x.created_at, reverse=True)
+            if not backup_type or backup_type == 'configuration':
+                backups.extend(self._scan_backup_dir(self.config_backup_dir, '.json', 'configuration'))
             
             return backups
             
@@ -315,12 +371,43 @@ class BackupService:
             logger.error(f"Failed to list backups: {str(e)}")
             raise
     
+    def _scan_backup_dir(self, directory: Path, suffix: str, backup_type: str) -> List[BackupInfo]:
+        """List the backups in a directory, rescanning only if it changed since the last scan
+        
+        Adding, renaming or removing a file updates the directory's mtime,
+        so an unchanged mtime means the cached listing is still complete.
+        """
+        mtime = directory.stat().st_mtime_ns
+        cached = self._backup_index_cache.get(directory)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        
+        backups = []
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                # Same selection as glob("*" + suffix): no hidden files
+                if entry.name.startswith('.') or not entry.name.endswith(suffix):
+                    continue
+                
+                stat = entry.stat()
+                backups.append(BackupInfo(
+                    name=entry.name,
+                    path=entry.path,
+                    size_bytes=stat.st_size,
+                    created_ts=stat.st_mtime,
+                    backup_type=backup_type
+                ))
+        
+        self._backup_index_cache[directory] = (mtime, backups)
+        return backups
+    
     async def cleanup_old_backups(self) -> Dict[str, int]:
         """Clean up old backup files"""
         if not self.backup_enabled:
             return {'deleted': 0, 'kept': 0}
         
-        cutoff_date = datetime.now() - timedelta(days=self.backup_retention_days)
+        # Compared against raw file mtimes, so no datetime is built per file
+        cutoff_ts = (datetime.now() - timedelta(days=self.backup_retention_days)).timestamp()
         deleted_count = 0
         kept_count = 0
         
@@ -328,42 +415,54 @@ class BackupService:
             # Get all backups
             all_backups = await self.list_backups()
             
-            # Sort by type and date
-            backups_by_type = {}
+            # Group by type
+            backups_by_type = defaultdict(list)
             for backup in all_backups:
-                if backup.backup_type not in backups_by_type:
-                    backups_by_type[backup.backup_type] = []
                 backups_by_type[backup.backup_type].append(backup)
             
-            # Clean up each type
-            for backup_type, backups in backups_by_type.items():
-                # Sort by date (newest first)
-                backups.sort(key=lambda x: x.created_at, reverse=True)
+            # Clean up each type: a backup is kept only if it is among the
+            # max_backups newest of its type and within the retention period
+            expired_backups = []
+            for backups in backups_by_type.values():
+                newest = heapq.nlargest(self.max_backups, backups, key=lambda x: x.created_ts)
+                kept = {id(backup) for backup in newest if backup.created_ts >= cutoff_ts}
                 
-                # Keep recent backups and respect max_backups limit
-                for i, backup in enumerate(backups):
-                    should_delete = (
-                        backup.created_at < cutoff_date and i >= self.max_backups
-                    ) or i >= self.max_backups
+                kept_count += len(kept)
+                expired_backups.extend(backup for backup in backups if id(backup) not in kept)
+            
+            # Clean up old manifests; scandir yields names without a stat, so
+            # only manifests are stat'ed, once each
+            expired_manifests = []
+            with os.scandir(self.backup_root) as entries:
+                for entry in entries:
+                    if not (entry.name.startswith('manifest_') and entry.name.endswith('.json')):
+                        continue
                     
-                    if should_delete:
-                        try:
-                            Path(backup.path).unlink()
-                            deleted_count += 1
-                            logger.info(f"Deleted old backup: {backup.name}")
-                        except Exception as e:
-                            logger.warning(f"Failed to delete backup {backup.name}: {str(e)}")
-                    else:
-                        kept_count += 1
-            
-            # Clean up old manifests
-            for manifest_file in self.backup_root.glob("manifest_*.json"):
-                if datetime.fromtimestamp(manifest_file.stat().st_mtime) < cutoff_date:
-                    try:
-                        manifest_file.unlink()
-                        logger.info(f"Deleted old manifest: {manifest_file.name}")
-                    except Exception as e:
-                        logger.warning(f"Failed to delete manifest {manifest_file.name}: {str(e)}")
+                    if entry.stat().st_mtime < cutoff_ts:
+                        expired_manifests.append(entry)
+            
+            # Delete everything at once on worker threads, so on slow or
+            # remote storage the unlinks overlap instead of queueing
+            results = await asyncio.gather(
+                *(asyncio.to_thread(os.unlink, backup.path) for backup in expired_backups),
+                *(asyncio.to_thread(os.unlink, entry.path) for entry in expired_manifests),
+                return_exceptions=True
+            )
+            if expired_backups:
+                self._backup_index_cache.clear()
+            
+            for backup, result in zip(expired_backups, results):
+                if isinstance(result, Exception):
+                    logger.warning(f"Failed to delete backup {backup.name}: {str(result)}")
+                else:
+                    deleted_count += 1
+                    logger.info(f"Deleted old backup: {backup.name}")
+            
+            for entry, result in zip(expired_manifests, results[len(expired_backups):]):
+                if isinstance(result, Exception):
+                    logger.warning(f"Failed to delete manifest {entry.name}: {str(result)}")
+                else:
+                    logger.info(f"Deleted old manifest: {entry.name}")
             
             logger.info(f"Backup cleanup completed: {deleted_count} deleted, {kept_count} kept")
             return {'deleted': deleted_count, 'kept': kept_count}
@@ -377,20 +476,19 @@ class BackupService:
         try:
             backups = await self.list_backups()
             
-            # Calculate statistics
+            # Calculate statistics and group by type in one pass
             total_backups = len(backups)
-            total_size = sum(b.size_bytes for b in backups)
-            
-            # Group by type
+            total_size = 0
             by_type = {}
             for backup in backups:
-                if backup.backup_type not in by_type:
-                    by_type[backup.backup_type] = {'count': 0, 'size_bytes': 0}
-                by_type[backup.backup_type]['count'] += 1
-                by_type[backup.backup_type]['size_bytes'] += backup.size_bytes
+                total_size += backup.size_bytes
+                type_stats = by_type.get(backup.backup_type)
+                if type_stats is None:
+                    type_stats = by_type[backup.backup_type] = {'count': 0, 'size_bytes': 0}
+                type_stats['count'] += 1
+                type_stats['size_bytes'] += backup.size_bytes
             
-            # Find latest backup
-            latest_backup = max(backups, key=lambda x: x.created_at) if backups else None
+            latest_backup = max(backups, key=lambda x: x.created_ts, default=None)
             
             status = {
                 'enabled': self.backup_enabled,
@@ -423,9 +521,8 @@ class BackupService:
     
     def stop_scheduler(self):
         """Stop the backup scheduler"""
-        self._scheduler_running = False
-        if self._scheduler_thread:
-            self._scheduler_thread.join(timeout=5)
+        if self._scheduler_task and not self._scheduler_task.done():
+            self._scheduler_task.cancel()
         logger.info("Backup scheduler stopped")
     
     def __del__(self):
@@ -2,9 +2,99 @@
 
 import os
 import json
-from typing import Dict, Any, Optional
-from dataclasses import dataclass, asdict
+from functools import lru_cache
+from typing import Any, Callable, Dict, Optional, Tuple
+from dataclasses import dataclass, fields, is_dataclass
 from pathlib import Path
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+    orjson = None
+
+
+_MISSING = object()
+
+
+@lru_cache(maxsize=256)
+def _key_path(key: str) -> Tuple[str, ...]:
+    """Split a dotted configuration key, once per distinct key
+    
+    Only the parsing is cached: the configuration is mutable (see
+    from_environment), so values are always read live.
+    """
+    return tuple(key.split('.'))
+
+
+@lru_cache(maxsize=None)
+def _field_names(cls: type) -> Tuple[str, ...]:
+    """Field names of a configuration dataclass, looked up once per class"""
+    return tuple(field.name for field in fields(cls))
+
+
+def _to_dict(value: Any) -> Any:
+    """Equivalent of dataclasses.asdict for configuration objects
+    
+    Sections, lists and dicts are rebuilt as with asdict, but leaf values
+    (str, int, float, bool, None) are shared instead of passed through
+    copy.deepcopy one by one.
+    """
+    if is_dataclass(value):
+        return {name: _to_dict(getattr(value, name)) for name in _field_names(type(value))}
+    if isinstance(value, list):
+        return [_to_dict(item) for item in value]
+    if isinstance(value, dict):
+        return {key: _to_dict(item) for key, item in value.items()}
+    return value
+
+
+_BOOL_MAP = {'true': True}
+
+
+def _parse_bool(value: str) -> bool:
+    """Parse a boolean environment variable; only 'true' (any case) is true"""
+    return _BOOL_MAP.get(value.lower(), False)
+
+
+def _parse_optional_int(value: str) -> Optional[int]:
+    """Parse an optional integer environment variable; empty means unset"""
+    return int(value) if value else None
+
+
+# (environment variable, dotted config key, parser), applied in order by
+# from_environment for the variables that are actually set
+_ENV_SPEC: Tuple[Tuple[str, Tuple[str, ...], Callable[[str], Any]], ...] = tuple(
+    (env_var, _key_path(key), parser)
+    for env_var, key, parser in (
+        # Main platform settings
+        ('SECURON_ENVIRONMENT', 'environment', str),
+        ('SECURON_DEBUG', 'debug', _parse_bool),
+        ('SECURON_API_HOST', 'api_host', str),
+        ('SECURON_API_PORT', 'api_port', int),
+        # Database settings
+        ('SECURON_DB_HOST', 'database.host', str),
+        ('SECURON_DB_PORT', 'database.port', int),
+        ('SECURON_DB_NAME', 'database.name', str),
+        ('SECURON_DB_USER', 'database.user', str),
+        ('SECURON_DB_PASSWORD', 'database.password', str),
+        # ML Engine settings
+        ('SECURON_ML_CONTAMINATION', 'ml_engine.contamination', float),
+        ('SECURON_ML_RANDOM_STATE', 'ml_engine.random_state', int),
+        ('SECURON_ML_BATCH_SIZE', 'ml_engine.batch_size', int),
+        ('SECURON_ML_MAX_MEMORY_MB', 'ml_engine.max_memory_mb', int),
+        ('SECURON_ML_REFIT_EVERY', 'ml_engine.refit_every', _parse_optional_int),
+        ('SECURON_ML_N_JOBS', 'ml_engine.n_jobs', _parse_optional_int),
+        ('SECURON_ML_USE_GPU', 'ml_engine.use_gpu', _parse_bool),
+        # Rule Engine settings
+        ('SECURON_RULES_STORAGE_PATH', 'rule_engine.storage_path', str),
+        ('SECURON_RULES_MAX_RULES', 'rule_engine.max_rules', int),
+        ('SECURON_RULES_BACKUP_ENABLED', 'rule_engine.backup_enabled', _parse_bool),
+        # Logging settings
+        ('SECURON_LOG_LEVEL', 'logging.level', str),
+        ('SECURON_LOG_FILE_PATH', 'logging.file_path', str),
+    )
+)
 
 
 @dataclass
@@ -33,6 +123,9 @@ class MLEngineConfig:
     random_state: int = 42
     batch_size: int = 1000
     max_memory_mb: int = 512
+    refit_every: Optional[int] = None
+    n_jobs: Optional[int] = None
+    use_gpu: bool = False
     
 
 @dataclass
@@ -155,34 +248,16 @@ class PlatformConfig:
     def from_environment(cls) -> 'PlatformConfig':
         """Load configuration from environment variables"""
         config = cls()
+        environ = os.environ
         
-        # Main platform settings
-        config.environment = os.getenv('SECURON_ENVIRONMENT', config.environment)
-        config.debug = os.getenv('SECURON_DEBUG', str(config.debug)).lower() == 'true'
-        config.api_host = os.getenv('SECURON_API_HOST', config.api_host)
-        config.api_port = int(os.getenv('SECURON_API_PORT', str(config.api_port)))
-        
-        # Database settings
-        config.database.host = os.getenv('SECURON_DB_HOST', config.database.host)
-        config.database.port = int(os.getenv('SECURON_DB_PORT', str(config.database.port)))
-        config.database.name = os.getenv('SECURON_DB_NAME', config.database.name)
-        config.database.user = os.getenv('SECURON_DB_USER', config.database.user)
-        config.database.password = os.getenv('SECURON_DB_PASSWORD', config.database.password)
-        
-        # ML Engine settings
-        config.ml_engine.contamination = float(os.getenv('SECURON_ML_CONTAMINATION', str(config.ml_engine.contamination)))
-        config.ml_engine.random_state = int(os.getenv('SECURON_ML_RANDOM_STATE', str(config.ml_engine.random_state)))
-        config.ml_engine.batch_size = int(os.getenv('SECURON_ML_BATCH_SIZE', str(config.ml_engine.batch_size)))
-        config.ml_engine.max_memory_mb = int(os.getenv('SECURON_ML_MAX_MEMORY_MB', str(config.ml_engine.max_memory_mb)))
-        
-        # Rule Engine settings
-        config.rule_engine.storage_path = os.getenv('SECURON_RULES_STORAGE_PATH', config.rule_engine.storage_path)
-        config.rule_engine.max_rules = int(os.getenv('SECURON_RULES_MAX_RULES', str(config.rule_engine.max_rules)))
-        config.rule_engine.backup_enabled = os.getenv('SECURON_RULES_BACKUP_ENABLED', str(config.rule_engine.backup_enabled)).lower() == 'true'
-        
-        # Logging settings
-        config.logging.level = os.getenv('SECURON_LOG_LEVEL', config.logging.level)
-        config.logging.file_path = os.getenv('SECURON_LOG_FILE_PATH', config.logging.file_path)
+        for env_var, path, parser in _ENV_SPEC:
+            raw = environ.get(env_var)
+            if raw is None:
+                continue
+            target = config
+            for name in path[:-1]:
+                target = getattr(target, name)
+            setattr(target, path[-1], parser(raw))
         
         return config
     
@@ -192,10 +267,13 @@ class PlatformConfig:
         config_file.parent.mkdir(parents=True, exist_ok=True)
         
         # Convert to dict for JSON serialization
-        config_dict = asdict(self)
+        config_dict = self.to_dict()
         
-        with open(config_file, 'w') as f:
-            json.dump(config_dict, f, indent=2)
+        # Encode in full and write once rather than chunk by chunk
+        if ORJSON_AVAILABLE:
+            config_file.write_bytes(orjson.dumps(config_dict, option=orjson.OPT_INDENT_2))
+        else:
+            config_file.write_text(json.dumps(config_dict, indent=2))
     
     def validate(self) -> None:
         """Validate configuration values"""
@@ -208,6 +286,9 @@ class PlatformConfig:
         if self.ml_engine.batch_size <= 0:
             errors.append("ML Engine batch_size must be positive")
         
+        if self.ml_engine.refit_every is not None and self.ml_engine.refit_every <= 0:
+            errors.append("ML Engine refit_every must be positive")
+        
         # Validate Rule Engine config
         if self.rule_engine.max_rules <= 0:
             errors.append("Rule Engine max_rules must be positive")
@@ -233,19 +314,13 @@ class PlatformConfig:
     
     def get(self, key: str, default: Any = None) -> Any:
         """Get configuration value using dot notation"""
-        keys = key.split('.')
         value = self
-        
-        try:
-            for k in keys:
-                if hasattr(value, k):
-                    value = getattr(value, k)
-                else:
-                    return default
-            return value
-        except (AttributeError, KeyError):
-            return default
+        for k in _key_path(key):
+            value = getattr(value, k, _MISSING)
+            if value is _MISSING:
+                return default
+        return value
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert configuration to dictionary"""
-        return asdict(self)
\ No newline at end of file
+        return _to_dict(self)
\ No newline at end of file
@@ -3,9 +3,19 @@
 import asyncio
 import json
 import logging
+import sqlite3
+from collections import defaultdict
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any, Union
+from functools import lru_cache
+from typing import Dict, List, Optional, Any, Tuple, Union
 from pathlib import Path
+from pydantic import TypeAdapter
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+    orjson = None
 
 from .database import DatabaseManager, DatabaseError
 from ..interfaces.core_types import (
@@ -20,32 +30,89 @@ from ..ml_engine.interfaces import AnomalyResult
 logger = logging.getLogger(__name__)
 
 
+def _json_dumps(data: Any) -> str:
+    """Serialize data to JSON text, with str() for types JSON can't encode"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(data, default=str, option=orjson.OPT_NON_STR_KEYS).decode()
+    return json.dumps(data, default=str)
+
+
+# Stored columns are decoded row by row on every read
+_json_loads = orjson.loads if ORJSON_AVAILABLE else json.loads
+
+# Stored enum values to members, for decoding rows without going through
+# EnumMeta.__call__ once per row
+_LOG_SOURCES = {source.value: source for source in LogSource}
+_ANOMALY_TYPES = {anomaly_type.value: anomaly_type for anomaly_type in AnomalyType}
+
+# Serializes a finding's patterns straight to JSON in pydantic-core
+_PATTERNS_ADAPTER = TypeAdapter(List[AnomalyPattern])
+
+_ML_FINDING_INSERT = """
+    INSERT INTO ml_findings 
+    (id, anomaly_type, severity, confidence, affected_resources, 
+     time_window_start, time_window_end, patterns, explanation, checksum)
+    VALUES """
+_ML_FINDING_PLACEHOLDERS = "(?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+_ML_FINDING_COLUMN_COUNT = 10
+
+@lru_cache(maxsize=None)
+def _cloud_logs_query(by_source: bool, by_start: bool, by_end: bool) -> str:
+    """SELECT used by get_cloud_logs, built once per combination of filters
+    
+    Each combination keeps its own statement, with only the predicates in
+    use, so SQLite can still pick the source and timestamp indexes; a
+    single "? IS NULL OR ..." statement would hide them from the planner.
+    """
+    query = "SELECT * FROM cloud_logs WHERE 1=1"
+    if by_source:
+        query += " AND source = ?"
+    if by_start:
+        query += " AND timestamp >= ?"
+    if by_end:
+        query += " AND timestamp <= ?"
+    return query + " ORDER BY timestamp DESC LIMIT ?"
+
+
+# Batches at least this large are validated and serialized on a worker
+# thread, so the event loop isn't blocked while they are encoded
+_SERIALIZE_OFFLOAD_MIN_LOGS = 1000
+
+# Default bound-parameter limit of the linked SQLite library
+_SQLITE_MAX_VARIABLES = 32766 if sqlite3.sqlite_version_info >= (3, 32, 0) else 999
+
+
 class DataAccessError(Exception):
     """Exception raised for data access operations"""
     pass
 
 
 class DataValidator:
-    """Validates data before storage operations"""
+    """Validates data before storage operations
+    
+    Inputs are pydantic models, so required fields are present and typed
+    once they are constructed; only the constraints the models don't
+    express are checked here.
+    """
     
     @staticmethod
     def validate_security_rule(rule: SecurityRule) -> List[str]:
         """Validate security rule data"""
         errors = []
         
-        if not rule.id or len(rule.id.strip()) < 3:
+        if len(rule.id.strip()) < 3:
             errors.append("Rule ID must be at least 3 characters")
         
-        if not rule.name or len(rule.name.strip()) < 3:
+        if len(rule.name.strip()) < 3:
             errors.append("Rule name must be at least 3 characters")
         
-        if not rule.description or len(rule.description.strip()) < 10:
+        if len(rule.description.strip()) < 10:
             errors.append("Rule description must be at least 10 characters")
         
-        if not rule.pattern or len(rule.pattern.strip()) < 1:
+        if not rule.pattern.strip():
             errors.append("Rule pattern cannot be empty")
         
-        if not rule.remediation or len(rule.remediation.strip()) < 10:
+        if len(rule.remediation.strip()) < 10:
             errors.append("Rule remediation must be at least 10 characters")
         
         return errors
@@ -53,25 +120,23 @@ class DataValidator:
     @staticmethod
     def validate_cloud_log(log: CloudLog) -> List[str]:
         """Validate cloud log data"""
-        errors = []
+        entry = log.normalized_data
         
-        if not log.timestamp:
-            errors.append("Log timestamp is required")
+        # Called for every log of a batch: settle the common, valid case
+        # with one chained test before building any messages
+        if log.raw_data and entry.source_ip and entry.action:
+            return []
         
-        if not log.source:
-            errors.append("Log source is required")
+        errors = []
         
         if not log.raw_data:
             errors.append("Log raw data cannot be empty")
         
-        if not log.normalized_data:
-            errors.append("Log normalized data is required")
-        
         # Validate normalized data
-        if not log.normalized_data.source_ip:
+        if not entry.source_ip:
             errors.append("Normalized log must have source IP")
         
-        if not log.normalized_data.action:
+        if not entry.action:
             errors.append("Normalized log must have action")
         
         return errors
@@ -84,9 +149,6 @@ class DataValidator:
         if not anomaly.id:
             errors.append("Anomaly ID is required")
         
-        if not anomaly.type:
-            errors.append("Anomaly type is required")
-        
         if anomaly.severity < 0 or anomaly.severity > 1:
             errors.append("Anomaly severity must be between 0 and 1")
         
@@ -96,9 +158,6 @@ class DataValidator:
         if not anomaly.affected_resources:
             errors.append("Anomaly must have affected resources")
         
-        if not anomaly.time_window:
-            errors.append("Anomaly must have time window")
-        
         return errors
 
 
@@ -109,25 +168,14 @@ class SecuronDataAccess:
         self.db_manager = DatabaseManager(db_path, backup_enabled)
         self.validator = DataValidator()
         
-        # Performance monitoring
-        self._operation_counts = {}
-        self._error_counts = {}
+        # Performance monitoring: [successes, errors] per operation
+        self._operation_counts: Dict[str, List[int]] = defaultdict(lambda: [0, 0])
         
         logger.info("SecuronDataAccess initialized")
     
     def _record_operation(self, operation: str, success: bool = True):
         """Record operation for monitoring"""
-        if operation not in self._operation_counts:
-            self._operation_counts[operation] = {'success': 0, 'error': 0}
-        
-        if success:
-            self._operation_counts[operation]['success'] += 1
-        else:
-            self._operation_counts[operation]['error'] += 1
-            
-            if operation not in self._error_counts:
-                self._error_counts[operation] = 0
-            self._error_counts[operation] += 1
+        self._operation_counts[operation][0 if success else 1] += 1
     
     # Security Rules Operations
     async def store_security_rule(self, rule: SecurityRule) -> None:
@@ -231,33 +279,48 @@ class SecuronDataAccess:
             raise DataAccessError(f"Failed to delete security rule: {str(e)}")
     
     # Cloud Logs Operations
+    def _cloud_log_rows(self, logs: List[CloudLog], batch_id: str) -> List[Tuple[Any, ...]]:
+        """Validate logs and serialize them into cloud_logs rows, skipping invalid ones"""
+        rows = []
+        validate_cloud_log = self.validator.validate_cloud_log
+        for log in logs:
+            # Validate log
+            validation_errors = validate_cloud_log(log)
+            if validation_errors:
+                logger.warning(f"Skipping invalid log: {', '.join(validation_errors)}")
+                continue
+            
+            # Serialize data; the checksum covers the stored JSON text
+            raw_data_json = _json_dumps(log.raw_data)
+            normalized_data_json = log.normalized_data.model_dump_json()
+            checksum = self.db_manager._calculate_checksum((raw_data_json + normalized_data_json).encode())
+            
+            rows.append((
+                log.timestamp, log.source.value, raw_data_json,
+                normalized_data_json, batch_id, checksum
+            ))
+        
+        return rows
+    
     async def store_cloud_logs(self, logs: List[CloudLog], batch_id: Optional[str] = None) -> None:
         """Store cloud logs with validation"""
         try:
             if not batch_id:
                 batch_id = f"batch_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
             
+            # Validate and serialize the whole batch before touching the database
+            if len(logs) >= _SERIALIZE_OFFLOAD_MIN_LOGS:
+                rows = await asyncio.to_thread(self._cloud_log_rows, logs, batch_id)
+            else:
+                rows = self._cloud_log_rows(logs, batch_id)
+            
+            # One statement and one transaction for the whole batch
             async with self.db_manager.get_connection() as conn:
-                for log in logs:
-                    # Validate log
-                    validation_errors = self.validator.validate_cloud_log(log)
-                    if validation_errors:
-                        logger.warning(f"Skipping invalid log: {', '.join(validation_errors)}")
-                        continue
-                    
-                    # Serialize data
-                    raw_data_json = json.dumps(log.raw_data)
-                    normalized_data_json = json.dumps(log.normalized_data.model_dump(), default=str)
-                    checksum = self.db_manager._calculate_checksum(log.model_dump())
-                    
-                    conn.execute("""
-                        INSERT INTO cloud_logs 
-                        (timestamp, source, raw_data, normalized_data, batch_id, checksum)
-                        VALUES (?, ?, ?, ?, ?, ?)
-                    """, (
-                        log.timestamp, log.source.value, raw_data_json,
-                        normalized_data_json, batch_id, checksum
-                    ))
+                conn.executemany("""
+                    INSERT INTO cloud_logs 
+                    (timestamp, source, raw_data, normalized_data, batch_id, checksum)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                """, rows)
                 
                 conn.commit()
             
@@ -273,51 +336,40 @@ class SecuronDataAccess:
                            source: Optional[LogSource] = None,
                            start_time: Optional[datetime] = None,
                            end_time: Optional[datetime] = None,
-                           limit: int = 1000) -> List[CloudLog]:
-        """Get cloud logs with filtering"""
+                           limit: int = 1000,
+                           verify_integrity: bool = False) -> List[CloudLog]:
+        """Get cloud logs with filtering
+        
+        Checksums are only re-validated when verify_integrity is set; use
+        scrub_cloud_logs to check the whole table in the background.
+        """
         try:
-            query = "SELECT * FROM cloud_logs WHERE 1=1"
+            query = _cloud_logs_query(bool(source), bool(start_time), bool(end_time))
             params = []
             
             if source:
-                query += " AND source = ?"
                 params.append(source.value)
             
             if start_time:
-                query += " AND timestamp >= ?"
                 params.append(start_time)
             
             if end_time:
-                query += " AND timestamp <= ?"
                 params.append(end_time)
             
-            query += " ORDER BY timestamp DESC LIMIT ?"
             params.append(limit)
             
             async with self.db_manager.get_connection() as conn:
-                rows = conn.execute(query, params).fetchall()
+                # Iterate the cursor: rows are stepped and decoded one at a
+                # time instead of all being materialized first
+                cursor = conn.execute(query, params)
                 
                 logs = []
-                for row in rows:
+                for row in cursor:
                     try:
-                        raw_data = json.loads(row['raw_data'])
-                        normalized_data_dict = json.loads(row['normalized_data'])
-                        
-                        # Convert timestamp strings back to datetime
-                        if isinstance(normalized_data_dict['timestamp'], str):
-                            normalized_data_dict['timestamp'] = datetime.fromisoformat(normalized_data_dict['timestamp'])
-                        
-                        normalized_data = NormalizedLogEntry(**normalized_data_dict)
-                        
-                        log = CloudLog(
-                            timestamp=datetime.fromisoformat(row['timestamp']),
-                            source=LogSource(row['source']),
-                            raw_data=raw_data,
-                            normalized_data=normalized_data
-                        )
+                        log = self._row_to_cloud_log(row)
                         
                         # Validate integrity
-                        if self.db_manager._validate_data_integrity(row['checksum'], log.model_dump()):
+                        if not verify_integrity or self._cloud_log_checksum_ok(row, log):
                             logs.append(log)
                         else:
                             logger.warning(f"Skipping log with integrity check failure")
@@ -334,39 +386,115 @@ class SecuronDataAccess:
             logger.error(f"Failed to get cloud logs: {str(e)}")
             raise DataAccessError(f"Failed to get cloud logs: {str(e)}")
     
+    @staticmethod
+    def _row_to_cloud_log(row: Any) -> CloudLog:
+        """Rebuild a CloudLog from a cloud_logs row"""
+        raw_data = _json_loads(row['raw_data'])
+        # The model parses its own timestamp: model_dump_json writes UTC as
+        # 'Z', which datetime.fromisoformat only accepts from Python 3.11
+        normalized_data = NormalizedLogEntry(**_json_loads(row['normalized_data']))
+        
+        return CloudLog(
+            timestamp=datetime.fromisoformat(row['timestamp']),
+            source=_LOG_SOURCES[row['source']],
+            raw_data=raw_data,
+            normalized_data=normalized_data
+        )
+    
+    def _cloud_log_checksum_ok(self, row: Any, log: CloudLog) -> bool:
+        """Check a cloud_logs row against its stored checksum
+        
+        Rows are checksummed over the bytes of their raw_data and
+        normalized_data JSON text; rows stored before that carry a checksum of log.model_dump(),
+        which is only computed when the first check fails.
+        """
+        checksum = row['checksum']
+        return (
+            self.db_manager._validate_data_integrity(checksum, (row['raw_data'] + row['normalized_data']).encode())
+            or self.db_manager._validate_data_integrity(checksum, log.model_dump())
+        )
+    
+    async def scrub_cloud_logs(self, batch_size: int = 1000) -> Dict[str, Any]:
+        """Verify the checksum of every stored cloud log
+        
+        Walks the table in id order, batch_size rows at a time, so it can run
+        as a background job. Returns the number of rows checked and the ids
+        of the rows that failed to load or to match their checksum.
+        """
+        checked = 0
+        corrupted_ids = []
+        last_id = 0
+        
+        try:
+            while True:
+                async with self.db_manager.get_connection() as conn:
+                    rows = conn.execute(
+                        "SELECT * FROM cloud_logs WHERE id > ? ORDER BY id LIMIT ?",
+                        (last_id, batch_size)
+                    ).fetchall()
+                
+                if not rows:
+                    break
+                
+                for row in rows:
+                    checked += 1
+                    try:
+                        log = self._row_to_cloud_log(row)
+                        valid = self._cloud_log_checksum_ok(row, log)
+                    except Exception as e:
+                        logger.warning(f"Failed to deserialize log {row['id']}: {str(e)}")
+                        valid = False
+                    
+                    if not valid:
+                        corrupted_ids.append(row['id'])
+                
+                last_id = rows[-1]['id']
+                # Let other tasks run between batches
+                await asyncio.sleep(0)
+            
+            if corrupted_ids:
+                logger.warning(f"Cloud log scrub found {len(corrupted_ids)} corrupted logs out of {checked}")
+            
+            self._record_operation('scrub_cloud_logs', True)
+            return {'checked': checked, 'corrupted_ids': corrupted_ids}
+            
+        except Exception as e:
+            self._record_operation('scrub_cloud_logs', False)
+            logger.error(f"Failed to scrub cloud logs: {str(e)}")
+            raise DataAccessError(f"Failed to scrub cloud logs: {str(e)}")
+    
     # ML Findings Operations
+    def _ml_finding_row(self, anomaly: AnomalyResult, explanation: Explanation) -> Tuple[Any, ...]:
+        """Validate a finding and serialize it into ml_findings column order"""
+        validation_errors = self.validator.validate_anomaly_result(anomaly)
+        if validation_errors:
+            raise DataAccessError(f"Anomaly validation failed: {', '.join(validation_errors)}")
+        
+        # Serialize complex data
+        affected_resources_json = _json_dumps(anomaly.affected_resources)
+        patterns_json = _PATTERNS_ADAPTER.dump_json(anomaly.patterns).decode()
+        explanation_json = explanation.model_dump_json()
+        
+        checksum = self.db_manager._calculate_checksum({
+            'id': anomaly.id,
+            'type': anomaly.type.value,
+            'severity': anomaly.severity,
+            'confidence': anomaly.confidence
+        })
+        
+        return (
+            anomaly.id, anomaly.type.value, anomaly.severity, anomaly.confidence,
+            affected_resources_json, anomaly.time_window.start, anomaly.time_window.end,
+            patterns_json, explanation_json, checksum
+        )
+    
     async def store_ml_finding(self, anomaly: AnomalyResult, explanation: Explanation) -> None:
         """Store ML finding/anomaly with explanation"""
         try:
-            # Validate anomaly
-            validation_errors = self.validator.validate_anomaly_result(anomaly)
-            if validation_errors:
-                raise DataAccessError(f"Anomaly validation failed: {', '.join(validation_errors)}")
+            row = self._ml_finding_row(anomaly, explanation)
             
             async with self.db_manager.get_connection() as conn:
-                # Serialize complex data
-                affected_resources_json = json.dumps(anomaly.affected_resources)
-                patterns_json = json.dumps([p.model_dump() for p in anomaly.patterns])
-                explanation_json = json.dumps(explanation.model_dump())
-                
-                checksum = self.db_manager._calculate_checksum({
-                    'id': anomaly.id,
-                    'type': anomaly.type.value,
-                    'severity': anomaly.severity,
-                    'confidence': anomaly.confidence
-                })
-                
-                conn.execute("""
-                    INSERT INTO ml_findings 
-                    (id, anomaly_type, severity, confidence, affected_resources, 
-                     time_window_start, time_window_end, patterns, explanation, checksum)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    anomaly.id, anomaly.type.value, anomaly.severity, anomaly.confidence,
-                    affected_resources_json, anomaly.time_window.start, anomaly.time_window.end,
-                    patterns_json, explanation_json, checksum
-                ))
-                
+                conn.execute(_ML_FINDING_INSERT + _ML_FINDING_PLACEHOLDERS, row)
                 conn.commit()
             
             self._record_operation('store_ml_finding', True)
@@ -377,6 +505,34 @@ class SecuronDataAccess:
             logger.error(f"Failed to store ML finding {anomaly.id}: {str(e)}")
             raise DataAccessError(f"Failed to store ML finding: {str(e)}")
     
+    async def store_ml_findings(self, findings: List[Tuple[AnomalyResult, Explanation]]) -> None:
+        """Store several ML findings in one transaction
+        
+        Findings are inserted with multi-row INSERT statements, as many rows
+        per statement as SQLite's parameter limit allows. If any finding is
+        invalid, none are stored.
+        """
+        try:
+            rows = [self._ml_finding_row(anomaly, explanation) for anomaly, explanation in findings]
+            rows_per_statement = _SQLITE_MAX_VARIABLES // _ML_FINDING_COLUMN_COUNT
+            
+            async with self.db_manager.get_connection() as conn:
+                for start in range(0, len(rows), rows_per_statement):
+                    chunk = rows[start:start + rows_per_statement]
+                    placeholders = ", ".join([_ML_FINDING_PLACEHOLDERS] * len(chunk))
+                    params = [value for row in chunk for value in row]
+                    conn.execute(_ML_FINDING_INSERT + placeholders, params)
+                
+                conn.commit()
+            
+            self._record_operation('store_ml_findings', True)
+            logger.info(f"Stored {len(rows)} ML findings")
+            
+        except Exception as e:
+            self._record_operation('store_ml_findings', False)
+            logger.error(f"Failed to store ML findings: {str(e)}")
+            raise DataAccessError(f"Failed to store ML findings: {str(e)}")
+    
     async def get_ml_findings(self, 
                             anomaly_type: Optional[AnomalyType] = None,
                             processed: Optional[bool] = None,
@@ -398,23 +554,24 @@ class SecuronDataAccess:
             params.append(limit)
             
             async with self.db_manager.get_connection() as conn:
-                rows = conn.execute(query, params).fetchall()
+                # Stream rows from the cursor, as in get_cloud_logs
+                cursor = conn.execute(query, params)
                 
                 findings = []
-                for row in rows:
+                for row in cursor:
                     try:
                         finding = {
                             'id': row['id'],
-                            'anomaly_type': AnomalyType(row['anomaly_type']),
+                            'anomaly_type': _ANOMALY_TYPES[row['anomaly_type']],
                             'severity': row['severity'],
                             'confidence': row['confidence'],
-                            'affected_resources': json.loads(row['affected_resources']),
+                            'affected_resources': _json_loads(row['affected_resources']),
                             'time_window': TimeRange(
                                 start=datetime.fromisoformat(row['time_window_start']),
                                 end=datetime.fromisoformat(row['time_window_end'])
                             ),
-                            'patterns': [AnomalyPattern(**p) for p in json.loads(row['patterns'])],
-                            'explanation': Explanation(**json.loads(row['explanation'])),
+                            'patterns': [AnomalyPattern(**p) for p in _json_loads(row['patterns'])],
+                            'explanation': Explanation(**_json_loads(row['explanation'])),
                             'created_at': datetime.fromisoformat(row['created_at']),
                             'processed': bool(row['processed'])
                         }
@@ -478,15 +635,20 @@ class SecuronDataAccess:
             health['database'] = db_stats
             
             # Operation statistics
-            health['operations'] = self._operation_counts.copy()
-            health['error_counts'] = self._error_counts.copy()
-            
-            # Calculate error rates
+            operations = {}
+            error_counts = {}
             error_rates = {}
-            for operation, counts in self._operation_counts.items():
-                total = counts['success'] + counts['error']
+            for operation, (successes, errors) in self._operation_counts.items():
+                operations[operation] = {'success': successes, 'error': errors}
+                if errors:
+                    error_counts[operation] = errors
+                
+                # Calculate error rates
+                total = successes + errors
                 if total > 0:
-                    error_rates[operation] = counts['error'] / total
+                    error_rates[operation] = errors / total
+            health['operations'] = operations
+            health['error_counts'] = error_counts
             health['error_rates'] = error_rates
             
             # System status
@@ -506,5 +668,4 @@ class SecuronDataAccess:
     async def reset_statistics(self) -> None:
         """Reset operation statistics"""
         self._operation_counts.clear()
-        self._error_counts.clear()
         logger.info("Operation statistics reset")
\ No newline at end of file
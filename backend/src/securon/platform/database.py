@@ -1,6 +1,7 @@
 """Database management and schema for Securon platform"""
 
 import sqlite3
+import hashlib
 import json
 import os
 import shutil
@@ -19,6 +20,18 @@ from ..rule_engine.models import RuleVersion, RuleConflict, RuleMetrics
 
 logger = logging.getLogger(__name__)
 
+# Applied to every connection handed out by DatabaseManager.get_connection.
+# journal_mode=WAL is persistent and set once in _initialize_database; the
+# rest are per-connection settings. With WAL, synchronous=NORMAL only syncs
+# at checkpoints, and busy_timeout makes writers wait instead of failing.
+_CONNECTION_PRAGMAS = (
+    "PRAGMA foreign_keys = ON",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA busy_timeout = 30000",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA mmap_size = 268435456",
+)
+
 
 class DatabaseError(Exception):
     """Exception raised for database operations"""
@@ -244,7 +257,8 @@ class DatabaseManager:
         conn = None
         try:
             conn = sqlite3.connect(self.db_path)
-            conn.execute("PRAGMA foreign_keys = ON")
+            for pragma in _CONNECTION_PRAGMAS:
+                conn.execute(pragma)
             conn.row_factory = sqlite3.Row  # Enable dict-like access
             yield conn
         except Exception as e:
@@ -256,8 +270,14 @@ class DatabaseManager:
                 conn.close()
     
     def _calculate_checksum(self, data: Any) -> str:
-        """Calculate checksum for data integrity"""
-        import hashlib
+        """Calculate checksum for data integrity
+        
+        Already-serialized bytes are hashed as they are with BLAKE2b; other
+        values keep their original SHA-256 checksum so stored rows still
+        validate.
+        """
+        if isinstance(data, bytes):
+            return hashlib.blake2b(data, digest_size=8).hexdigest()
         if isinstance(data, dict):
             data_str = json.dumps(data, sort_keys=True, default=str)
         else:
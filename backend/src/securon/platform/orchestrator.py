@@ -11,6 +11,7 @@ from ..interfaces import *
 from ..ml_engine.factory import create_ml_engine
 # Delayed import to avoid circular dependency
 from ..log_processor.batch_processor import BatchLogProcessor
+from ..process_pool import shutdown_process_pool
 
 from .config import PlatformConfig
 from .logging import setup_logging, get_logger, log_component_startup, log_component_shutdown, log_error_with_context, log_performance_metric
@@ -154,7 +155,10 @@ class PlatformOrchestrator:
         try:
             self.ml_engine = create_ml_engine(
                 contamination=self.config.ml_engine.contamination,
-                random_state=self.config.ml_engine.random_state
+                random_state=self.config.ml_engine.random_state,
+                refit_every=self.config.ml_engine.refit_every,
+                n_jobs=self.config.ml_engine.n_jobs,
+                use_gpu=self.config.ml_engine.use_gpu
             )
             
             # Test the ML engine with empty logs
@@ -277,8 +281,9 @@ class PlatformOrchestrator:
         """Shutdown ML Engine component"""
         if self.ml_engine:
             try:
-                # ML engine doesn't have explicit shutdown, just clear reference
+                # Stop the scoring workers along with the engine
                 self.ml_engine = None
+                shutdown_process_pool()
                 log_component_shutdown('ml_engine')
             except Exception as e:
                 log_error_with_context('ml_engine', e, {'phase': 'shutdown'})
@@ -297,7 +302,7 @@ class PlatformOrchestrator:
         """Shutdown Log Processor component"""
         if self.log_processor:
             try:
-                # Log processor doesn't have explicit shutdown, just clear reference
+                self.log_processor.close()
                 self.log_processor = None
                 log_component_shutdown('log_processor')
             except Exception as e:
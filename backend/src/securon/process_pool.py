@@ -0,0 +1,47 @@
+"""Process pool shared by the CPU-bound stages of the platform"""
+
+import atexit
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+# Worker processes, started on first use and shared by every component in
+# the process
+_process_pool: Optional[ProcessPoolExecutor] = None
+_process_pool_lock = threading.Lock()
+
+
+def _pool_context() -> multiprocessing.context.BaseContext:
+    """Start method for pool workers: never fork
+
+    The API process runs threads (the event loop's executor, the database
+    write queue, ...), and a forked child can inherit one of their locks
+    held and deadlock on it. forkserver forks workers from a clean
+    single-threaded server instead; spawn is the fallback where it is not
+    available.
+    """
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('forkserver')
+    return multiprocessing.get_context('spawn')
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """Return the shared process pool, creating it if needed"""
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is None:
+            _process_pool = ProcessPoolExecutor(mp_context=_pool_context())
+        return _process_pool
+
+
+def shutdown_process_pool() -> None:
+    """Stop the shared pool's workers; the next get_process_pool starts a new pool"""
+    global _process_pool
+    with _process_pool_lock:
+        pool, _process_pool = _process_pool, None
+    if pool is not None:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+atexit.register(shutdown_process_pool)
@@ -2,21 +2,26 @@
 
 import pytest
 import asyncio
+import concurrent.futures
+import os
 import tempfile
 import shutil
-from datetime import datetime, timedelta
+import threading
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
 from typing import List
 
 from src.securon.platform.database import DatabaseManager, DatabaseError
+from src.securon.platform import data_access as data_access_module
 from src.securon.platform.data_access import SecuronDataAccess, DataAccessError
-from src.securon.platform.backup_service import BackupService
+from src.securon.platform.backup_service import BackupService, _next_daily_run
 from src.securon.platform.integrity_service import DataIntegrityService
 from src.securon.interfaces.iac_scanner import SecurityRule
 from src.securon.interfaces.core_types import (
     Severity, RuleSource, RuleStatus, LogSource, AnomalyType,
-    CloudLog, NormalizedLogEntry, TimeRange
+    CloudLog, NormalizedLogEntry, TimeRange, AnomalyPattern, Explanation
 )
+from src.securon.ml_engine.interfaces import AnomalyResult
 
 
 class TestDatabaseManager:
@@ -43,6 +48,15 @@ class TestDatabaseManager:
         # Check that database file has content (SQLite files are binary)
         assert db_manager.db_path.stat().st_size > 0
     
+    @pytest.mark.asyncio
+    async def test_connection_pragmas(self, db_manager):
+        """Test that connections use WAL with relaxed syncing and a busy timeout"""
+        async with db_manager.get_connection() as conn:
+            assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+            assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+            assert conn.execute("PRAGMA busy_timeout").fetchone()[0] == 30000
+            assert conn.execute("PRAGMA foreign_keys").fetchone()[0] == 1
+    
     @pytest.mark.asyncio
     async def test_security_rule_storage(self, db_manager):
         """Test storing and retrieving security rules"""
@@ -306,6 +320,168 @@ class TestDataAccess:
         )
         assert len(recent_logs) >= 2  # Should include logs from last 2 hours
     
+    @pytest.mark.asyncio
+    async def test_large_cloud_log_batch_serialized_off_loop(self, data_access, monkeypatch):
+        """Test that batches over the offload threshold are encoded on a worker thread"""
+        monkeypatch.setattr(data_access_module, '_SERIALIZE_OFFLOAD_MIN_LOGS', 3)
+        serializing_threads = []
+        cloud_log_rows = data_access._cloud_log_rows
+        
+        def recording_cloud_log_rows(logs, batch_id):
+            serializing_threads.append(threading.get_ident())
+            return cloud_log_rows(logs, batch_id)
+        
+        monkeypatch.setattr(data_access, '_cloud_log_rows', recording_cloud_log_rows)
+        
+        logs = [
+            CloudLog(
+                timestamp=datetime.now(),
+                source=LogSource.CLOUDTRAIL,
+                raw_data={"eventName": f"event_{i}"},
+                normalized_data=NormalizedLogEntry(
+                    timestamp=datetime.now(),
+                    source_ip=f"10.1.0.{i+1}",
+                    action="ALLOW" if i else ""  # the first log is invalid
+                )
+            )
+            for i in range(4)
+        ]
+        await data_access.store_cloud_logs(logs[:2], "small-batch")
+        await data_access.store_cloud_logs(logs, "large-batch")
+        
+        main_thread = threading.get_ident()
+        assert serializing_threads[0] == main_thread
+        assert serializing_threads[1] != main_thread
+        
+        stored = await data_access.get_cloud_logs(source=LogSource.CLOUDTRAIL, verify_integrity=True)
+        assert len(stored) == 4  # one valid log from the small batch, three from the large one
+    
+    @pytest.mark.asyncio
+    async def test_utc_normalized_timestamp_round_trip(self, data_access, monkeypatch):
+        """Test that 'Z'-suffixed normalized timestamps decode without fromisoformat"""
+        class Pre311Datetime(datetime):
+            @classmethod
+            def fromisoformat(cls, value):
+                # datetime.fromisoformat rejects a 'Z' suffix before Python 3.11
+                if value.endswith('Z'):
+                    raise ValueError(f"Invalid isoformat string: {value!r}")
+                return super().fromisoformat(value)
+        
+        monkeypatch.setattr(data_access_module, 'datetime', Pre311Datetime)
+        timestamp = datetime(2023, 1, 1, 12, 0, tzinfo=timezone.utc)
+        log = CloudLog(
+            timestamp=timestamp,
+            source=LogSource.VPC_FLOW,
+            raw_data={"srcaddr": "192.168.1.1"},
+            normalized_data=NormalizedLogEntry(timestamp=timestamp, source_ip="192.168.1.1", action="ACCEPT")
+        )
+        
+        await data_access.store_cloud_logs([log], "utc-batch")
+        
+        stored = await data_access.get_cloud_logs(verify_integrity=True)
+        assert [stored_log.normalized_data for stored_log in stored] == [log.normalized_data]
+    
+    @pytest.mark.asyncio
+    async def test_cloud_log_integrity_checks(self, data_access):
+        """Test opt-in checksum validation on reads and the background scrub"""
+        logs = [
+            CloudLog(
+                timestamp=datetime.now(),
+                source=LogSource.VPC_FLOW,
+                raw_data={"test": f"data_{i}"},
+                normalized_data=NormalizedLogEntry(
+                    timestamp=datetime.now(),
+                    source_ip=f"192.168.1.{i+1}",
+                    action="ALLOW"
+                )
+            )
+            for i in range(3)
+        ]
+        await data_access.store_cloud_logs(logs, "integrity-batch")
+        
+        # Row 3 keeps the checksum format used before checksums covered the
+        # stored JSON text
+        legacy_checksum = data_access.db_manager._calculate_checksum(logs[2].model_dump())
+        async with data_access.db_manager.get_connection() as conn:
+            conn.execute("UPDATE cloud_logs SET checksum = 'tampered' WHERE id = 2")
+            conn.execute("UPDATE cloud_logs SET checksum = ? WHERE id = 3", (legacy_checksum,))
+            conn.commit()
+        
+        assert len(await data_access.get_cloud_logs()) == 3
+        assert len(await data_access.get_cloud_logs(verify_integrity=True)) == 2
+        
+        result = await data_access.scrub_cloud_logs(batch_size=2)
+        assert result == {'checked': 3, 'corrupted_ids': [2]}
+    
+    @pytest.mark.asyncio
+    async def test_ml_finding_round_trip(self, data_access):
+        """Test that a stored ML finding reads back unchanged"""
+        anomaly = AnomalyResult(
+            id="finding-1",
+            type=AnomalyType.PORT_SCAN,
+            severity=0.8,
+            confidence=0.9,
+            affected_resources=["10.0.0.1", "10.0.0.2"],
+            time_window=TimeRange(start=datetime(2024, 1, 1, 12), end=datetime(2024, 1, 1, 13)),
+            patterns=[AnomalyPattern(feature="port", expected_range=(0.0, 1024.0), actual_value=8080.0, deviation=3.5)]
+        )
+        explanation = Explanation(
+            summary="Port scan detected",
+            risk_level=Severity.HIGH,
+            recommended_actions=["Block the source"],
+            technical_details="Scanned 2 hosts"
+        )
+        
+        await data_access.store_ml_finding(anomaly, explanation)
+        findings = await data_access.get_ml_findings()
+        
+        assert len(findings) == 1
+        finding = findings[0]
+        assert finding['id'] == anomaly.id
+        assert finding['anomaly_type'] == AnomalyType.PORT_SCAN
+        assert finding['affected_resources'] == anomaly.affected_resources
+        assert finding['time_window'] == anomaly.time_window
+        assert finding['patterns'] == anomaly.patterns
+        assert finding['explanation'].risk_level == Severity.HIGH
+        assert finding['explanation'].technical_details == "Scanned 2 hosts"
+        assert finding['processed'] is False
+    
+    @pytest.mark.asyncio
+    async def test_ml_findings_batch_storage(self, data_access, monkeypatch):
+        """Test storing findings in multi-row inserts split by the parameter limit"""
+        # Two rows per INSERT statement, so five findings need three
+        monkeypatch.setattr(data_access_module, '_SQLITE_MAX_VARIABLES', 20)
+        time_window = TimeRange(start=datetime(2024, 1, 1, 12), end=datetime(2024, 1, 1, 13))
+        explanation = Explanation(
+            summary="Brute force detected",
+            risk_level=Severity.MEDIUM,
+            recommended_actions=["Lock the account"]
+        )
+        findings = [
+            (AnomalyResult(
+                id=f"batch-finding-{i}",
+                type=AnomalyType.BRUTE_FORCE,
+                severity=0.5,
+                confidence=0.7,
+                affected_resources=[f"user{i}"],
+                time_window=time_window,
+                patterns=[]
+            ), explanation)
+            for i in range(5)
+        ]
+        
+        await data_access.store_ml_findings(findings)
+        
+        stored = await data_access.get_ml_findings(anomaly_type=AnomalyType.BRUTE_FORCE)
+        assert sorted(f['id'] for f in stored) == [f"batch-finding-{i}" for i in range(5)]
+        
+        # An invalid finding rejects the whole batch
+        valid = findings[0][0].model_copy(update={'id': 'batch-valid'})
+        invalid = findings[0][0].model_copy(update={'id': 'batch-invalid', 'severity': 2.0})
+        with pytest.raises(DataAccessError):
+            await data_access.store_ml_findings([(valid, explanation), (invalid, explanation)])
+        assert len(await data_access.get_ml_findings(anomaly_type=AnomalyType.BRUTE_FORCE)) == 5
+    
     @pytest.mark.asyncio
     async def test_data_validation(self, data_access):
         """Test data validation functionality"""
@@ -351,6 +527,10 @@ class TestDataAccess:
         assert 'operations' in health
         assert 'status' in health
         assert health['status'] in ['healthy', 'degraded', 'error']
+        
+        assert health['operations']['store_security_rule'] == {'success': 1, 'error': 0}
+        assert health['error_counts'] == {}
+        assert health['error_rates']['store_security_rule'] == 0
 
 
 class TestBackupService:
@@ -447,6 +627,18 @@ class TestBackupService:
         for backup_info in backups.values():
             assert Path(backup_info.path).exists()
             assert backup_info.size_bytes > 0
+            assert backup_info.backup_type == 'test'
+            assert backup_info.description == 'Test full backup'
+    
+    @pytest.mark.asyncio
+    async def test_full_backup_shares_one_timestamp(self, backup_service):
+        """Test that all parts of a full backup are named after the same instant"""
+        now = datetime(2024, 1, 2, 3, 4, 5)
+        backups = await backup_service.create_full_backup(now=now)
+        
+        assert backups['database'].name == "full_db_20240102_030405.db"
+        assert backups['configuration'].name == "config_backup_20240102_030405.json"
+        assert (backup_service.backup_root / "manifest_20240102_030405.json").exists()
     
     @pytest.mark.asyncio
     async def test_backup_listing(self, backup_service):
@@ -481,6 +673,80 @@ class TestBackupService:
         assert status['total_size_bytes'] > 0
         assert 'latest_backup' in status
         assert status['latest_backup'] is not None
+    
+    @pytest.mark.asyncio
+    async def test_backup_listing_cache_tracks_directory_changes(self, backup_service):
+        """Test that cached backup listings are reused until a directory changes"""
+        await backup_service.create_database_backup()
+        
+        first = await backup_service.list_backups('database')
+        second = await backup_service.list_backups('database')
+        assert len(first) == 1
+        assert second[0] is first[0]
+        
+        # A file added behind the service's back changes the directory mtime
+        (backup_service.db_backup_dir / 'external.db').write_bytes(b'backup')
+        names = {b.name for b in await backup_service.list_backups('database')}
+        assert 'external.db' in names
+        assert len(names) == 2
+    
+    @pytest.mark.asyncio
+    async def test_cleanup_applies_age_and_count_limits(self, backup_service):
+        """Test that cleanup drops backups past retention as well as beyond max_backups"""
+        now = datetime.now().timestamp()
+        # Nine backups within the 7-day retention, two beyond it
+        ages_in_hours = list(range(9)) + [8 * 24, 9 * 24]
+        for i, age in enumerate(ages_in_hours):
+            backup_file = backup_service.db_backup_dir / f"backup_{i:02d}.db"
+            backup_file.write_bytes(b'backup')
+            os.utime(backup_file, (now - age * 3600, now - age * 3600))
+        
+        result = await backup_service.cleanup_old_backups()
+        
+        # Both expired backups go, although they are within max_backups (10)
+        remaining = sorted(b.name for b in await backup_service.list_backups('database'))
+        assert remaining == [f"backup_{i:02d}.db" for i in range(9)]
+        assert result == {'deleted': 2, 'kept': 9}
+    
+    @pytest.mark.asyncio
+    async def test_scheduler_runs_due_backup(self, backup_service):
+        """Test that the scheduler task runs a backup once it is due"""
+        backup_service.backup_interval_hours = 0.3 / 3600
+        backup_service.start_scheduler()
+        try:
+            await asyncio.sleep(0.6)
+        finally:
+            backup_service.stop_scheduler()
+        
+        backups = await backup_service.list_backups('database')
+        assert any(b.name.startswith('full_db_') for b in backups)
+        assert list(backup_service.backup_root.glob('manifest_*.json'))
+    
+    def test_scheduler_on_loop_in_another_thread(self, backup_service):
+        """Test that the scheduler can be started on a loop owned by another thread"""
+        loop = asyncio.new_event_loop()
+        thread = threading.Thread(target=loop.run_forever, daemon=True)
+        thread.start()
+        try:
+            backup_service.start_scheduler(loop)
+            # Round trip through the loop so the scheduler task has started
+            asyncio.run_coroutine_threadsafe(asyncio.sleep(0), loop).result(timeout=5)
+            assert not backup_service._scheduler_task.done()
+            
+            backup_service.stop_scheduler()
+            with pytest.raises(concurrent.futures.CancelledError):
+                backup_service._scheduler_task.result(timeout=5)
+        finally:
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join(timeout=5)
+            loop.close()
+    
+    def test_next_daily_run(self):
+        """Test that daily jobs are scheduled for the next occurrence of their time"""
+        at = datetime(2024, 1, 1, 2, 0).time()
+        assert _next_daily_run(datetime(2024, 1, 1, 1, 30), at) == datetime(2024, 1, 1, 2, 0)
+        assert _next_daily_run(datetime(2024, 1, 1, 2, 0), at) == datetime(2024, 1, 2, 2, 0)
+        assert _next_daily_run(datetime(2024, 1, 1, 23, 0), at) == datetime(2024, 1, 2, 2, 0)
 
 
 class TestIntegrityService:
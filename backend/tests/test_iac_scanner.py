@@ -1,18 +1,24 @@
 """Tests for IaC Scanner component"""
 
 import pytest
+import json
+import subprocess
 import tempfile
 import os
 from pathlib import Path
 
+import hcl2
+
 from src.securon.iac_scanner import (
     ConcreteIaCScanner, 
     IaCScannerError,
     TerraformParser,
     TerraformParseError,
+    TerraformParseCache,
     DefaultSecurityRules,
     IaCScannerFactory
 )
+from src.securon.iac_scanner import terraform_parser
 from src.securon.interfaces.iac_scanner import SecurityRule, ScanResult
 from src.securon.interfaces.core_types import Severity, RuleSource, RuleStatus
 from datetime import datetime
@@ -62,11 +68,13 @@ resource "aws_security_group" "test_sg" {
                 assert s3_resource.name == "test_bucket"
                 assert s3_resource.configuration["bucket"] == "my-test-bucket"
                 assert s3_resource.configuration["acl"] == "private"
+                assert s3_resource.line_number == 2
                 
                 # Check Security Group resource
                 sg_resource = next(r for r in resources if r.type == "aws_security_group")
                 assert sg_resource.name == "test_sg"
                 assert sg_resource.configuration["name"] == "test-sg"
+                assert sg_resource.line_number == 7
                 
             finally:
                 os.unlink(f.name)
@@ -102,6 +110,77 @@ resource "aws_security_group" "test_sg" {
             finally:
                 os.unlink(f.name)
     
+    @pytest.mark.asyncio
+    async def test_parse_normalizes_list_attributes(self, parser):
+        """Test that scalar ingress/policy fields are coerced to lists"""
+        json_content = '''
+{
+  "resource": {
+    "aws_security_group": {
+      "sg": {
+        "ingress": {"from_port": 22, "to_port": 22, "cidr_blocks": ["0.0.0.0/0"]}
+      }
+    },
+    "aws_iam_role": {
+      "role": {
+        "assume_role_policy": {
+          "Statement": {
+            "Action": "sts:AssumeRole",
+            "Principal": {"AWS": "arn:aws:iam::123456789012:root"}
+          }
+        }
+      }
+    }
+  }
+}
+'''
+        with tempfile.NamedTemporaryFile(mode='w', suffix='.tf.json', delete=False) as f:
+            f.write(json_content)
+            f.flush()
+
+            try:
+                resources = await parser.parse_file(f.name)
+
+                sg_resource = next(r for r in resources if r.type == "aws_security_group")
+                assert sg_resource.configuration["ingress"] == [
+                    {"from_port": 22, "to_port": 22, "cidr_blocks": ["0.0.0.0/0"]}
+                ]
+
+                role_resource = next(r for r in resources if r.type == "aws_iam_role")
+                statements = role_resource.configuration["assume_role_policy"]["Statement"]
+                assert statements == [{
+                    "Action": ["sts:AssumeRole"],
+                    "Principal": {"AWS": ["arn:aws:iam::123456789012:root"]}
+                }]
+
+            finally:
+                os.unlink(f.name)
+
+    @pytest.mark.asyncio
+    async def test_parse_cache_invalidated_on_change(self, sample_terraform_content):
+        """Test that parse results are cached until the file changes"""
+        cache = TerraformParseCache(max_entries=4)
+        parser = TerraformParser(cache=cache)
+        with tempfile.NamedTemporaryFile(mode='w', suffix='.tf', delete=False) as f:
+            f.write(sample_terraform_content)
+            f.flush()
+
+            try:
+                first = await parser.parse_file(f.name)
+                second = await parser.parse_file(f.name)
+                assert len(cache) == 1
+                assert [r.name for r in first] == [r.name for r in second]
+
+                with open(f.name, 'a') as extra:
+                    extra.write('\nresource "aws_instance" "web" {\n  ami = "ami-1"\n}\n')
+
+                updated = await parser.parse_file(f.name)
+                assert len(updated) == 3
+                assert len(cache) == 2
+
+            finally:
+                os.unlink(f.name)
+
     @pytest.mark.asyncio
     async def test_parse_invalid_file(self, parser):
         """Test parsing of invalid Terraform files"""
@@ -121,6 +200,149 @@ resource "aws_s3_bucket" "test" {
                 os.unlink(f.name)
 
 
+# Blocks are listed in the order hcl2json prints them (it sorts object keys),
+# so python-hcl2's file-order block lists line up with the converted output
+HCL2JSON_SOURCE = '''
+data "aws_iam_policy_document" "p" {
+  statement {
+    actions = ["s3:*"]
+  }
+}
+
+locals {
+  env = "prod"
+}
+
+provider "aws" {
+  region = "us-east-1"
+}
+
+resource "aws_s3_bucket" "logs" {
+  bucket = "logs"
+}
+
+resource "aws_security_group" "db" {
+  name = "db-sg"
+}
+
+resource "aws_security_group" "web" {
+  name = "web-sg"
+  tags = {
+    Name = "web"
+  }
+
+  ingress {
+    from_port   = 80
+    to_port     = 80
+    cidr_blocks = ["0.0.0.0/0"]
+  }
+
+  ingress {
+    from_port = 443
+    to_port   = 443
+  }
+
+  dynamic "egress" {
+    for_each = var.ports
+    content {
+      from_port = egress.value
+    }
+  }
+
+  lifecycle {
+    create_before_destroy = true
+  }
+}
+
+terraform {
+  backend "s3" {
+    bucket = "state"
+  }
+}
+'''
+
+# Output of `hcl2json` for HCL2JSON_SOURCE
+HCL2JSON_OUTPUT = {
+    "data": {"aws_iam_policy_document": {"p": [{"statement": [{"actions": ["s3:*"]}]}]}},
+    "locals": [{"env": "prod"}],
+    "provider": {"aws": [{"region": "us-east-1"}]},
+    "resource": {
+        "aws_s3_bucket": {"logs": [{"bucket": "logs"}]},
+        "aws_security_group": {
+            "db": [{"name": "db-sg"}],
+            "web": [{
+                "dynamic": {"egress": [{
+                    "content": [{"from_port": "${egress.value}"}],
+                    "for_each": "${var.ports}"
+                }]},
+                "ingress": [
+                    {"cidr_blocks": ["0.0.0.0/0"], "from_port": 80, "to_port": 80},
+                    {"from_port": 443, "to_port": 443}
+                ],
+                "lifecycle": [{"create_before_destroy": True}],
+                "name": "web-sg",
+                "tags": {"Name": "web"}
+            }]
+        }
+    },
+    "terraform": [{"backend": {"s3": [{"bucket": "state"}]}}]
+}
+
+
+class TestHcl2JsonBackend:
+    """Test the optional hcl2json parser backend"""
+    
+    @pytest.fixture
+    def fake_hcl2json(self, monkeypatch):
+        """Route _hcl_loads through a stubbed hcl2json binary; returns the calls made"""
+        calls = []
+        
+        def run(args, **kwargs):
+            calls.append(kwargs)
+            return subprocess.CompletedProcess(args, 0, stdout=json.dumps(HCL2JSON_OUTPUT).encode(), stderr=b'')
+        
+        monkeypatch.setattr(terraform_parser, '_HCL2JSON_BINARY', '/usr/bin/hcl2json')
+        monkeypatch.setattr(terraform_parser.subprocess, 'run', run)
+        return calls
+    
+    def test_output_matches_python_hcl2_layout(self, fake_hcl2json):
+        """Test that converted hcl2json output has python-hcl2's block layout"""
+        assert terraform_parser._hcl_loads(HCL2JSON_SOURCE) == hcl2.loads(HCL2JSON_SOURCE)
+        assert fake_hcl2json[0]['timeout'] == terraform_parser._HCL2JSON_TIMEOUT
+    
+    @pytest.mark.asyncio
+    async def test_parsed_resources_keep_nested_blocks(self, fake_hcl2json):
+        """Test that resources parsed via hcl2json expose nested blocks such as ingress"""
+        with tempfile.NamedTemporaryFile(mode='w', suffix='.tf', delete=False) as f:
+            # Distinct content, so the shared parse cache can't answer
+            f.write(HCL2JSON_SOURCE + "\n# parsed via hcl2json\n")
+        
+        try:
+            resources = await TerraformParser().parse_file(f.name)
+        finally:
+            os.unlink(f.name)
+        
+        web = next(r for r in resources if r.name == "web")
+        assert [rule["from_port"] for rule in web.configuration["ingress"]] == [80, 443]
+        assert web.configuration["lifecycle"] == [{"create_before_destroy": True}]
+        assert {r.type for r in resources} == {
+            "aws_s3_bucket", "aws_security_group", "data.aws_iam_policy_document"
+        }
+    
+    @pytest.mark.parametrize('outcome', ['timeout', 'failure'])
+    def test_falls_back_to_python_hcl2(self, monkeypatch, outcome):
+        """Test that a hung or failing hcl2json falls back to python-hcl2"""
+        def run(args, **kwargs):
+            if outcome == 'timeout':
+                raise subprocess.TimeoutExpired(args, kwargs['timeout'])
+            return subprocess.CompletedProcess(args, 1, stdout=b'', stderr=b'error')
+        
+        monkeypatch.setattr(terraform_parser, '_HCL2JSON_BINARY', '/usr/bin/hcl2json')
+        monkeypatch.setattr(terraform_parser.subprocess, 'run', run)
+        
+        assert terraform_parser._hcl_loads(HCL2JSON_SOURCE) == hcl2.loads(HCL2JSON_SOURCE)
+
+
 class TestIaCScanner:
     """Test IaC Scanner functionality"""
     
@@ -291,6 +513,35 @@ resource "aws_s3_bucket" "another_bucket" {
         assert len(custom_rules) == 1
         assert custom_rules[0].name == "Custom Rule"
     
+    def test_rules_filtered_by_resource_type(self, scanner):
+        """Test that type-specific rules are skipped for other resource types"""
+        def make_rule(rule_id, pattern):
+            return SecurityRule(
+                id=rule_id,
+                name=rule_id,
+                description=rule_id,
+                severity=Severity.LOW,
+                pattern=pattern,
+                remediation="n/a",
+                source=RuleSource.STATIC,
+                status=RuleStatus.ACTIVE,
+                created_at=datetime.now()
+            )
+        
+        scanner.apply_rules([
+            make_rule("custom-s3", "resource_type:aws_s3_bucket"),
+            make_rule("custom-config", "config:tags"),
+            make_rule("sg-001", "resource_type:aws_security_group"),
+        ])
+        
+        s3_rule_ids = {rule.id for rule in scanner._rules_for_type("aws_s3_bucket")}
+        assert {"custom-s3", "custom-config"} <= s3_rule_ids
+        assert "sg-001" not in s3_rule_ids
+        
+        sg_rule_ids = {rule.id for rule in scanner._rules_for_type("aws_security_group")}
+        assert {"custom-config", "sg-001"} <= sg_rule_ids
+        assert "custom-s3" not in sg_rule_ids
+    
     def test_get_supported_resource_types(self, scanner):
         """Test getting supported resource types"""
         supported_types = scanner.get_supported_resource_types()
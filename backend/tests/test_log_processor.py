@@ -6,12 +6,16 @@ from typing import Dict, Any, List
 
 import sys
 import os
+import io
+import json
+import tempfile
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
 
 from securon.interfaces.core_types import LogSource, CloudLog
-from securon.log_processor.normalizer import LogNormalizer
+from securon.log_processor.normalizer import LogNormalizer, _parse_timestamp_str
 from securon.log_processor.validator import LogValidator, ValidationError
-from securon.log_processor.batch_processor import BatchProcessor
+from securon.log_processor import batch_processor
+from securon.log_processor.batch_processor import BatchProcessor, BatchLogProcessor
 
 
 class TestLogNormalizer:
@@ -58,6 +62,41 @@ class TestLogNormalizer:
         assert log.normalized_data.protocol == 'TCP'
         assert log.normalized_data.action == 'ACCEPT'
     
+    def test_normalize_vpc_flow_batch_matches_per_row(self):
+        """Test that the VPC Flow batch path matches per-row normalization"""
+        raw_logs = [
+            {'message': '2 123456789012 eni-1235b8ca 192.168.1.1 10.0.0.1 49152 80 6 20 1418530010 1418530010 1418530070 ACCEPT OK'},
+            {'message': '2 123456789012 eni-1235b8ca 192.168.1.2 10.0.0.1 49153 - 17 20 1418530010 1418530010 1418530070 reject OK'},
+            {'srcaddr': '192.168.1.3', 'dstaddr': '10.0.0.1', 'dstport': 443, 'protocol': '6', 'action': 'ACCEPT'},
+        ]
+        
+        result = self.normalizer.normalize_logs(raw_logs, LogSource.VPC_FLOW)
+        
+        assert len(result) == 3
+        assert result[0].timestamp == result[1].timestamp
+        assert result[1].normalized_data.port is None
+        assert result[1].normalized_data.action == 'REJECT'
+        for log, raw_log in zip(result[:2], raw_logs[:2]):
+            assert log.normalized_data == self.normalizer._normalize_vpc_flow_log(raw_log)
+        assert result[2].normalized_data.source_ip == '192.168.1.3'
+    
+    def test_normalize_vpc_flow_batch_logs_skipped_rows(self, caplog, capsys):
+        """Test that rows the VPC Flow batch path skips go to the logger, not stdout"""
+        raw_logs = [
+            {'message': '2 123456789012 eni-1235b8ca 192.168.1.1 10.0.0.1 49152 http 6 20 1418530010 1418530010 1418530070 ACCEPT OK'},
+            {'message': '2 123456789012 eni-1235b8ca 192.168.1.2 10.0.0.1 49153 80 6 20 1418530010 1418530010 1418530070 ACCEPT OK'},
+        ]
+        
+        with caplog.at_level('DEBUG', logger='securon.log_processor.normalizer'):
+            result = self.normalizer.normalize_logs(raw_logs, LogSource.VPC_FLOW)
+        
+        assert [log.normalized_data.source_ip for log in result] == ['192.168.1.2']
+        assert capsys.readouterr().out == ''
+        assert [record.getMessage() for record in caplog.records] == [
+            'Error normalizing log',
+            'Failed to normalize 1 of 2 logs',
+        ]
+    
     def test_normalize_cloudtrail_log(self):
         """Test CloudTrail log normalization"""
         raw_logs = [{
@@ -83,6 +122,39 @@ class TestLogNormalizer:
         assert log.normalized_data.user == 'testuser'
         assert log.normalized_data.api_call == 'CreateUser'
     
+    def test_iter_normalize_logs_is_lazy(self):
+        """Test that streaming normalization consumes input on demand"""
+        consumed = []
+        
+        def raw_logs():
+            for i in range(3):
+                consumed.append(i)
+                yield {'eventTime': '2023-01-01T12:00:00Z', 'eventName': f'Event{i}'}
+        
+        stream = self.normalizer.iter_normalize_logs(raw_logs(), LogSource.CLOUDTRAIL)
+        assert consumed == []
+        
+        first = next(stream)
+        assert first.normalized_data.action == 'Event0'
+        assert consumed == [0]
+        assert [log.normalized_data.action for log in stream] == ['Event1', 'Event2']
+        
+        with pytest.raises(ValueError):
+            self.normalizer.iter_normalize_logs([], 'UNKNOWN')
+    
+    def test_normalize_logs_without_raw_data(self):
+        """Test that keep_raw=False drops raw_data but not normalized fields"""
+        raw_logs = [
+            {'message': '2 123456789012 eni-1235b8ca 192.168.1.1 10.0.0.1 49152 80 6 20 1418530010 1418530010 1418530070 ACCEPT OK'},
+        ]
+        
+        kept = self.normalizer.normalize_logs(raw_logs, LogSource.VPC_FLOW)
+        dropped = self.normalizer.normalize_logs(raw_logs, LogSource.VPC_FLOW, keep_raw=False)
+        
+        assert kept[0].raw_data == raw_logs[0]
+        assert dropped[0].raw_data == {}
+        assert dropped[0].normalized_data == kept[0].normalized_data
+    
     def test_normalize_iam_log(self):
         """Test IAM log normalization"""
         raw_logs = [{
@@ -125,6 +197,59 @@ class TestLogNormalizer:
         now = datetime.now()
         ts3 = self.normalizer._parse_timestamp(now)
         assert ts3 == now
+    
+    def test_iso_timestamp_variants(self):
+        """Test ISO-8601 variants parse to naive datetimes"""
+        expected = datetime(2023, 1, 1, 12, 0, 0)
+        assert self.normalizer._parse_timestamp('2023-01-01T12:00:00Z') == expected
+        assert self.normalizer._parse_timestamp('2023-01-01 12:00:00') == expected
+        assert self.normalizer._parse_timestamp('2023-01-01T17:00:00+05:00') == expected
+        assert self.normalizer._parse_timestamp('2023-01-01T12:00:00.5Z') == datetime(2023, 1, 1, 12, 0, 0, 500000)
+        assert self.normalizer._parse_timestamp('2023-1-1T12:0:0Z') == expected
+    
+    def test_string_timestamps_memoized(self):
+        """Test repeated timestamp strings are parsed once and failures are not cached"""
+        _parse_timestamp_str.cache_clear()
+        
+        for _ in range(3):
+            self.normalizer._parse_timestamp('2023-01-01T12:00:00Z')
+        self.normalizer._parse_timestamp('not a timestamp')
+        
+        info = _parse_timestamp_str.cache_info()
+        assert info.hits == 2
+        assert info.currsize == 1
+    
+    def test_normalize_logs_arrow(self):
+        """Test columnar Arrow output round-trips to CloudLog objects"""
+        pytest.importorskip("pyarrow")
+        raw_logs = [
+            {'srcaddr': '192.168.1.1', 'dstaddr': '10.0.0.1', 'dstport': 80, 'protocol': '6',
+             'action': 'ACCEPT', 'timestamp': '2023-01-01T12:00:00Z'},
+            {'srcaddr': '192.168.1.2', 'dstport': 22, 'protocol': '6',
+             'action': 'REJECT', 'timestamp': '2023-01-01T12:00:05Z'},
+        ]
+        
+        batch = self.normalizer.normalize_logs_arrow(raw_logs, LogSource.VPC_FLOW)
+        
+        assert batch.num_rows == 2
+        assert batch.column('port').to_pylist() == [80, 22]
+        assert batch.column('protocol').type.value_type == 'string'
+        
+        logs = self.normalizer.arrow_to_cloud_logs(batch, LogSource.VPC_FLOW)
+        expected = self.normalizer.normalize_logs(raw_logs, LogSource.VPC_FLOW)
+        assert [log.normalized_data for log in logs] == [log.normalized_data for log in expected]
+    
+    def test_normalize_logs_arrow_skips_out_of_range_ports(self):
+        """Test that ports outside 0-65535 are skipped before the int32 column cast"""
+        pytest.importorskip("pyarrow")
+        raw_logs = [
+            {'srcaddr': '192.168.1.1', 'dstport': port, 'action': 'ACCEPT', 'timestamp': '2023-01-01T12:00:00Z'}
+            for port in (443, 2 ** 40, -1, 65535)
+        ]
+        
+        batch = self.normalizer.normalize_logs_arrow(raw_logs, LogSource.VPC_FLOW)
+        
+        assert batch.column('port').to_pylist() == [443, 65535]
 
 
 class TestLogValidator:
@@ -193,6 +318,8 @@ class TestLogValidator:
         assert self.validator._is_valid_ip('invalid') == False
         assert self.validator._is_valid_ip('') == False
         assert self.validator._is_valid_ip('-') == False
+        assert self.validator._is_valid_ip('10.1') == False
+        assert self.validator._is_valid_ip('1.2.3.4 ') == False
     
     def test_validation_summary(self):
         """Test validation summary generation"""
@@ -238,6 +365,65 @@ class TestBatchProcessor:
         assert len(processed_batches[0]) == 2
         assert all(isinstance(log, CloudLog) for log in processed_batches[0])
     
+    @pytest.mark.asyncio
+    async def test_process_logs_from_data_preserves_order(self):
+        """Test that pipelined batches are yielded in input order"""
+        logs = [
+            {
+                'srcaddr': f'192.168.1.{i}',
+                'dstaddr': '10.0.0.1',
+                'action': 'ACCEPT',
+                'timestamp': '2023-01-01T12:00:00Z'
+            }
+            for i in range(1, 8)
+        ]
+        progress = []
+        
+        processed = []
+        async for batch in self.processor.process_logs_from_data(
+            logs, LogSource.VPC_FLOW, lambda total, size: progress.append(total)
+        ):
+            processed.extend(batch)
+        
+        assert [log.normalized_data.source_ip for log in processed] == [log['srcaddr'] for log in logs]
+        assert progress == [2, 4, 6, 7]
+    
+    def test_process_batch_drops_invalid_logs(self):
+        """Test the fused batch pass drops logs failing any stage"""
+        batch = [
+            {'srcaddr': '192.168.1.1', 'action': 'ACCEPT', 'timestamp': '2023-01-01T12:00:00Z'},
+            {'action': 'ACCEPT', 'timestamp': '2023-01-01T12:00:00Z'},  # missing srcaddr
+            {'srcaddr': 'not-an-ip', 'action': 'ACCEPT', 'timestamp': '2023-01-01T12:00:00Z'},
+            {'srcaddr': '192.168.1.4', 'action': 'REJECT', 'timestamp': '2023-01-01T12:00:00Z'},
+        ]
+        
+        result = self.processor._process_batch_sync(batch, LogSource.VPC_FLOW)
+        
+        assert [log.normalized_data.source_ip for log in result] == ['192.168.1.1', '192.168.1.4']
+    
+    def test_process_batch_uses_vpc_flow_batch_path(self, monkeypatch):
+        """Test that VPC Flow batches are normalized through the batch path"""
+        batch_path = self.processor.normalizer._iter_vpc_flow_batch
+        batched = []
+        
+        def spy(logs, keep_raw=True):
+            for cloud_log in batch_path(logs, keep_raw):
+                batched.append(cloud_log)
+                yield cloud_log
+        
+        monkeypatch.setattr(self.processor.normalizer, '_iter_vpc_flow_batch', spy)
+        batch = [
+            {'message': '2 123456789012 eni-1235b8ca 192.168.1.1 10.0.0.1 49152 80 6 20 1418530010 1418530010 1418530070 ACCEPT OK',
+             'timestamp': '2014-12-14T04:06:50Z'},
+            {'srcaddr': '192.168.1.2', 'action': 'REJECT', 'timestamp': '2023-01-01T12:00:00Z'},
+        ]
+        
+        result = self.processor._process_batch_sync(batch, LogSource.VPC_FLOW)
+        
+        assert [log.normalized_data.source_ip for log in result] == ['192.168.1.1', '192.168.1.2']
+        assert batched == result
+        assert result[0].raw_data == batch[0]
+    
     @pytest.mark.asyncio
     async def test_process_all_logs(self):
         """Test processing all logs at once"""
@@ -255,10 +441,96 @@ class TestBatchProcessor:
         assert isinstance(result[0], CloudLog)
         assert result[0].source == LogSource.CLOUDTRAIL
     
+    @pytest.mark.asyncio
+    async def test_read_file_in_batches_json_array(self):
+        """Test that JSON array files are streamed in batch_size chunks"""
+        entries = [{'srcaddr': f'10.0.0.{i}', 'action': 'ACCEPT'} for i in range(5)]
+        with tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False) as f:
+            json.dump(entries, f)
+        
+        try:
+            batches = [batch async for batch in self.processor._read_file_in_batches(f.name)]
+        finally:
+            os.unlink(f.name)
+        
+        assert [len(batch) for batch in batches] == [2, 2, 1]
+        assert [entry for batch in batches for entry in batch] == entries
+    
+    @pytest.mark.asyncio
+    async def test_read_file_in_batches_text_lines(self):
+        """Test that JSONL and plain text lines are read line by line"""
+        content = '{"srcaddr": "10.0.0.1"}\n\n[2023-01-01] plain text entry\n'
+        with tempfile.NamedTemporaryFile(mode='w', suffix='.log', delete=False) as f:
+            f.write(content)
+        
+        try:
+            batches = [batch async for batch in self.processor._read_file_in_batches(f.name)]
+        finally:
+            os.unlink(f.name)
+        
+        assert batches == [[
+            {'srcaddr': '10.0.0.1'},
+            {'message': '[2023-01-01] plain text entry', 'line_number': 3}
+        ]]
+    
+    @pytest.mark.parametrize('use_ijson', [
+        pytest.param(True, marks=pytest.mark.skipif(not batch_processor.IJSON_AVAILABLE, reason="ijson not installed")),
+        False,
+    ])
+    @pytest.mark.parametrize('content', [b'[{bad}]\n', b'[] trailing text\n'])
+    def test_malformed_json_array_falls_back_to_lines(self, monkeypatch, use_ijson, content):
+        """Test that a "[..." file that isn't a valid JSON array is read as text lines"""
+        monkeypatch.setattr(batch_processor, 'IJSON_AVAILABLE', use_ijson)
+        
+        entries = list(self.processor._iter_log_entries(io.BytesIO(content)))
+        
+        assert entries == [{'message': content.decode().strip(), 'line_number': 1}]
+    
     def test_processing_stats(self):
         """Test processing statistics"""
         stats = self.processor.get_processing_stats()
         
         assert 'batch_size' in stats
         assert 'max_workers' in stats
-        assert stats['batch_size'] == 2
\ No newline at end of file
+        assert stats['batch_size'] == 2
+
+
+class TestBatchLogProcessor:
+    """Test the simplified log processing interface"""
+    
+    def setup_method(self):
+        self.processor = BatchLogProcessor()
+    
+    def test_detect_log_source_from_truncated_head(self):
+        """Test source detection when only the first record fits in the head"""
+        head = b'[{"raw_data": {"eventName": "ConsoleLogin"}}, {"raw_data": {"eventName": "Get'
+        assert self.processor._detect_log_source_from_bytes(head) == LogSource.CLOUDTRAIL
+    
+    def test_detect_log_source_text_markers(self):
+        """Test text-based source detection for non-JSON content"""
+        head = b'2 123456789012 eni-abc 10.0.0.1 10.0.0.2 srcaddr dstaddr'
+        assert self.processor._detect_log_source_from_bytes(head) == LogSource.VPC_FLOW
+        assert self.processor._detect_log_source_from_bytes(b'AWS CloudTrail export') == LogSource.CLOUDTRAIL
+    
+    @pytest.mark.asyncio
+    async def test_process_logs_from_fileobj_reads_from_start(self):
+        """Test that an open file is processed from its start after sniffing"""
+        entries = [{'srcaddr': '10.0.0.1', 'dstaddr': '10.0.0.2', 'action': 'ACCEPT'}]
+        with tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False) as f:
+            json.dump(entries, f)
+        
+        try:
+            with open(f.name, 'rb') as file:
+                source = self.processor._detect_log_source_from_fileobj(file)
+                file.seek(0)
+                batches = [
+                    batch async for batch in
+                    self.processor.processor._read_fileobj_in_batches(file)
+                ]
+        finally:
+            os.unlink(f.name)
+            self.processor.close()
+        
+        assert source == LogSource.VPC_FLOW
+        assert batches == [entries]
+
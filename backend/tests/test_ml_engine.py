@@ -1,12 +1,20 @@
 """Tests for ML Engine implementation"""
 
+import os
+import random
+import numpy as np
 import pytest
+import uuid
 from datetime import datetime, timedelta
 from typing import List
+from pydantic import ValidationError
 
 from src.securon.ml_engine import create_ml_engine, IsolationForestMLEngine
+from src.securon.ml_engine import engine as engine_module
+from src.securon import process_pool
+from src.securon.ml_engine.engine import _keyword_pattern, _new_anomaly_id, _severity_level
 from src.securon.interfaces.core_types import (
-    CloudLog, LogSource, NormalizedLogEntry, AnomalyType, Severity
+    CloudLog, LogSource, NormalizedLogEntry, AnomalyType, Severity, TimeRange, Explanation
 )
 from src.securon.interfaces.ml_engine import AnomalyResult
 from src.securon.interfaces.iac_scanner import SecurityRule, RuleSource, RuleStatus
@@ -132,6 +140,58 @@ class TestMLEngine:
                 assert rule.status == RuleStatus.CANDIDATE
                 assert rule.created_at is not None
     
+    def test_candidate_rules_average_severity_per_type(self):
+        """Test that candidate rules are grouped by type in order of first appearance"""
+        now = datetime.now()
+        anomalies = [
+            AnomalyResult(
+                id=str(uuid.uuid4()),
+                type=anomaly_type,
+                severity=severity,
+                confidence=0.9,
+                affected_resources=[],
+                time_window=TimeRange(start=now, end=now),
+                patterns=[]
+            )
+            for anomaly_type, severity in [
+                (AnomalyType.PORT_SCAN, 0.9),
+                (AnomalyType.BRUTE_FORCE, 0.3),
+                (AnomalyType.PORT_SCAN, 0.5),
+                (AnomalyType.BRUTE_FORCE, 0.6),
+            ]
+        ]
+        
+        rules = self.ml_engine.generate_candidate_rules(anomalies)
+        
+        assert [rule.name for rule in rules] == [
+            'ML-Generated Port Scan Detection',
+            'ML-Generated Brute Force Detection',
+        ]
+        assert [rule.severity for rule in rules] == [Severity.HIGH, Severity.MEDIUM]
+        assert self.ml_engine.generate_candidate_rules([]) == []
+    
+    def test_anomaly_patterns_are_shared(self):
+        """Test that equal anomaly patterns reuse one frozen instance"""
+        log = self.create_sample_logs(1)[0]
+        features = {'hour_of_day': 3, 'port': 22}
+        
+        first = self.ml_engine._generate_anomaly_patterns(features, log)
+        second = self.ml_engine._generate_anomaly_patterns(dict(features), log)
+        
+        assert [p.feature for p in first] == ['hour_of_day', 'port']
+        assert all(a is b for a, b in zip(first, second))
+        with pytest.raises(ValidationError):
+            first[0].deviation = 0.0
+    
+    def test_severity_level_thresholds(self):
+        """Test that severity scores map to levels with exclusive lower bounds"""
+        assert _severity_level(0.0) == Severity.LOW
+        assert _severity_level(0.4) == Severity.LOW
+        assert _severity_level(0.41) == Severity.MEDIUM
+        assert _severity_level(0.6) == Severity.MEDIUM
+        assert _severity_level(0.8) == Severity.HIGH
+        assert _severity_level(0.81) == Severity.CRITICAL
+    
     @pytest.mark.asyncio
     async def test_explain_anomaly(self):
         """Test anomaly explanation generation"""
@@ -147,6 +207,100 @@ class TestMLEngine:
             assert len(explanation.recommended_actions) > 0
             assert all(isinstance(action, str) for action in explanation.recommended_actions)
     
+    def test_explanation_renders_details_lazily(self):
+        """Test that deferred technical details render once, on first use"""
+        calls = []
+        
+        def render():
+            calls.append(1)
+            return "details"
+        
+        explanation = Explanation(
+            summary="summary",
+            technical_details=render,
+            risk_level=Severity.LOW,
+            recommended_actions=[]
+        )
+        assert calls == []
+        
+        assert explanation.model_dump()['technical_details'] == "details"
+        assert explanation.technical_details == "details"
+        assert calls == [1]
+        
+        restored = Explanation(**explanation.model_dump())
+        assert restored.technical_details == "details"
+    
+    @pytest.mark.asyncio
+    async def test_fit_keeps_model_across_batches(self):
+        """Test that an explicitly fitted model is reused, not retrained"""
+        engine = IsolationForestMLEngine(contamination=0.2)
+        logs = self.create_sample_logs(20)
+        engine.fit(logs)
+        estimators = engine.isolation_forest.estimators_
+        
+        anomalies = await engine.process_logs(logs[:10])
+        
+        assert engine.isolation_forest.estimators_ is estimators
+        assert all(isinstance(a, AnomalyResult) for a in anomalies)
+    
+    @pytest.mark.asyncio
+    async def test_refit_every_retrains_after_threshold(self):
+        """Test that refit_every retrains once enough logs were scored"""
+        engine = IsolationForestMLEngine(contamination=0.2, refit_every=20)
+        logs = self.create_sample_logs(15)
+        
+        await engine.process_logs(logs)
+        estimators = engine.isolation_forest.estimators_
+        await engine.process_logs(logs)
+        assert engine.isolation_forest.estimators_ is estimators
+        
+        await engine.process_logs(logs)
+        assert engine.isolation_forest.estimators_ is not estimators
+    
+    def test_cached_scores_match_isolation_forest(self):
+        """Test that scoring from cached path lengths matches scikit-learn"""
+        engine = IsolationForestMLEngine(contamination=0.2)
+        engine.fit(self.create_sample_logs(30))
+        features = engine.scaler.transform(engine._extract_features(self.create_sample_logs(25)).to_numpy())
+        
+        np.testing.assert_allclose(
+            engine._decision_function(features),
+            engine.isolation_forest.decision_function(features),
+            atol=1e-9,
+        )
+    
+    async def test_pooled_scoring_matches_inline(self, monkeypatch):
+        """Test that scoring in the process pool matches inline scoring"""
+        monkeypatch.setattr(engine_module, '_POOL_MIN_ROWS', 0)
+        engine = IsolationForestMLEngine(contamination=0.2)
+        engine.fit(self.create_sample_logs(30))
+        features = engine.scaler.transform(engine._extract_features(self.create_sample_logs(25)).to_numpy())
+        
+        np.testing.assert_array_equal(await engine._score(features), engine._decision_function(features))
+        assert os.listdir(engine._dump_dir) == ['model-1.joblib']
+        
+        # A refit drops the dump of the replaced model
+        engine.fit(self.create_sample_logs(30))
+        assert os.listdir(engine._dump_dir) == []
+        
+        # Workers are never forked from the threaded parent, and shutting the
+        # pool down lets the next batch start a fresh one
+        pool = process_pool.get_process_pool()
+        assert pool._mp_context.get_start_method() != 'fork'
+        process_pool.shutdown_process_pool()
+        assert process_pool.get_process_pool() is not pool
+        process_pool.shutdown_process_pool()
+    
+    async def test_use_gpu_falls_back_without_cuml(self):
+        """Test that use_gpu scores on the CPU when cuML is not installed"""
+        engine = IsolationForestMLEngine(contamination=0.2, use_gpu=True)
+        assert engine.use_gpu == engine_module.CUML_AVAILABLE
+        
+        if not engine_module.CUML_AVAILABLE:
+            anomalies = await engine.process_logs(self.create_sample_logs(15))
+            assert isinstance(anomalies, list)
+            assert engine._fil is None
+    
     def test_anomaly_type_classification(self):
         """Test anomaly type classification logic"""
         engine = IsolationForestMLEngine()
@@ -200,6 +354,51 @@ class TestMLEngine:
         anomaly_type = engine._classify_anomaly_type(api_log)
         assert anomaly_type == AnomalyType.UNUSUAL_API
     
+    def test_batch_classification_matches_per_log(self):
+        """Test that batch classification agrees with per-log classification"""
+        engine = IsolationForestMLEngine()
+        logs = self.create_sample_logs(5)
+        logs.append(CloudLog(
+            timestamp=datetime.now(),
+            source=LogSource.VPC_FLOW,
+            raw_data={},
+            normalized_data=NormalizedLogEntry(
+                timestamp=datetime.now(),
+                source_ip="192.168.1.1",
+                port=22,
+                action="LoginFailed",
+                resource="/wp-admin"
+            )
+        ))
+        
+        types = engine._classify_anomaly_types(logs)
+        
+        assert types == [engine._classify_anomaly_type(log) for log in logs]
+        assert types[-1] == AnomalyType.BRUTE_FORCE
+        assert engine._classify_anomaly_types([]) == []
+    
+    def test_anomaly_ids_are_uuid4(self):
+        """Test that anomaly ids are distinct version-4 UUID strings"""
+        ids = {_new_anomaly_id() for _ in range(1000)}
+        
+        assert len(ids) == 1000
+        assert all(uuid.UUID(anomaly_id).version == 4 for anomaly_id in ids)
+        
+        # Seeding the global random module does not make ids repeat
+        random.seed(0)
+        first = _new_anomaly_id()
+        random.seed(0)
+        assert _new_anomaly_id() != first
+    
+    def test_keyword_patterns_match_like_substring_scan(self):
+        """Test that keyword patterns match case-insensitive substrings only"""
+        pattern = _keyword_pattern(['login', '.env'])
+        
+        assert pattern.search('FailedLogin')
+        assert pattern.search('GET /app/.ENV')
+        assert not pattern.search('GET /app/xenv')
+        assert not _keyword_pattern([]).search('login')
+    
     def test_feature_extraction(self):
         """Test feature extraction from logs"""
         engine = IsolationForestMLEngine()
@@ -238,6 +437,36 @@ class TestMLEngine:
         
         # Check that all values are numeric
         assert features_df.dtypes.apply(lambda x: x.kind in 'biufc').all()
+    
+    def test_feature_hashes_are_stable(self):
+        """Test that equal field values hash to the same bucket"""
+        engine = IsolationForestMLEngine()
+        timestamp = datetime(2023, 1, 2, 3, 0, 0)
+        logs = [
+            CloudLog(
+                timestamp=timestamp,
+                source=LogSource.VPC_FLOW,
+                raw_data={"test": "data"},
+                normalized_data=NormalizedLogEntry(
+                    timestamp=timestamp,
+                    source_ip="192.168.1.1",
+                    destination_ip=destination_ip,
+                    port=443,
+                    protocol="TCP",
+                    action="ACCEPT"
+                )
+            )
+            for destination_ip in ("10.0.0.1", None, "10.0.0.1")
+        ]
+        
+        features_df = engine._extract_features(logs)
+        
+        assert list(features_df['hour_of_day']) == [3, 3, 3]
+        assert list(features_df['day_of_week']) == [0, 0, 0]
+        assert features_df['source_ip_hash'].nunique() == 1
+        assert features_df['dest_ip_hash'][0] == features_df['dest_ip_hash'][2]
+        assert features_df['dest_ip_hash'][1] == 0
+        assert features_df.equals(engine._extract_features(logs))
 
 
 class TestMLEngineFactory:
@@ -3,6 +3,7 @@
 import pytest
 import tempfile
 import os
+from dataclasses import asdict
 from pathlib import Path
 
 from src.securon.platform import PlatformOrchestrator, PlatformConfig
@@ -203,6 +204,30 @@ class TestPlatformConfig:
         assert config.logging is not None
         assert config.monitoring is not None
     
+    def test_config_get_dotted_keys(self):
+        """Test dotted-key lookups, including values changed after construction"""
+        config = PlatformConfig()
+        
+        assert config.get('rule_engine.backup_enabled') is True
+        assert config.get('database') is config.database
+        assert config.get('rule_engine.missing', 'fallback') == 'fallback'
+        assert config.get('missing.key') is None
+        
+        config.rule_engine.backup_enabled = False
+        assert config.get('rule_engine.backup_enabled') is False
+    
+    def test_config_to_dict(self):
+        """Test that to_dict matches asdict and does not alias the config"""
+        config = PlatformConfig()
+        config_dict = config.to_dict()
+        
+        assert config_dict == asdict(config)
+        
+        config_dict['monitoring']['alert_thresholds']['cpu_usage'] = 1.0
+        config_dict['iac_scanner']['supported_extensions'].append('.yaml')
+        assert config.monitoring.alert_thresholds['cpu_usage'] == 80.0
+        assert '.yaml' not in config.iac_scanner.supported_extensions
+    
     def test_config_validation(self):
         """Test configuration validation"""
         config = PlatformConfig()
@@ -235,6 +260,29 @@ class TestPlatformConfig:
                 if key in os.environ:
                     del os.environ[key]
     
+    def test_config_from_environment_nested_and_unset(self):
+        """Test nested keys, boolean parsing and unset variables"""
+        overrides = {
+            'SECURON_DB_PORT': '6543',
+            'SECURON_ML_USE_GPU': 'TRUE',
+            'SECURON_RULES_BACKUP_ENABLED': 'yes',
+            'SECURON_ML_N_JOBS': '',
+        }
+        os.environ.update(overrides)
+        
+        try:
+            config = PlatformConfig.from_environment()
+            
+            assert config.database.port == 6543
+            assert config.ml_engine.use_gpu is True
+            assert config.rule_engine.backup_enabled is False
+            assert config.ml_engine.n_jobs is None
+            assert config.database.host == PlatformConfig().database.host
+            
+        finally:
+            for key in overrides:
+                os.environ.pop(key, None)
+    
     def test_config_file_operations(self):
         """Test saving and loading configuration from file"""
         config = PlatformConfig()